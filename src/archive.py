@@ -0,0 +1,114 @@
+import os
+import json
+import sqlite3
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src import database
+from src.database import PARAM_TYPES
+
+CHUNK_ROWS = int(os.getenv("ARCHIVE_CHUNK_ROWS", "50000"))
+
+EXECUTION_SCHEMA = pa.schema([
+    ("order_id", pa.string()), ("symbol", pa.string()), ("side", pa.string()), ("qty", pa.float64()),
+    ("order_type", pa.string()), ("snapshot_price", pa.float64()), ("fill_price", pa.float64()),
+    ("slippage_pct", pa.float64()), ("submitted_at", pa.string()), ("filled_at", pa.string()),
+    ("api_latency_ms", pa.float64()), ("fill_latency_ms", pa.float64()), ("status", pa.string()),
+    ("queue_wait_ms", pa.float64()),
+])
+_ARROW_TYPES = {int: pa.int64(), float: pa.float64()}
+STRATEGY_SCHEMA = pa.schema([
+    ("symbol", pa.string()), ("is_active", pa.bool_()),
+    *[(k, _ARROW_TYPES[t]) for k, t in PARAM_TYPES.items()],
+    ("params_json", pa.string()),  # full params, so unknown keys survive a round trip
+])
+
+
+def _write_chunks(path, schema, chunks):
+    """Streams DataFrame chunks into one Parquet file. Returns the row count."""
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for df in chunks:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            rows += len(df)
+    return rows
+
+
+def _strategy_chunks(conn, chunk_rows):
+    for df in pd.read_sql("SELECT symbol, params, is_active FROM strategies ORDER BY symbol", conn,
+                          chunksize=chunk_rows):
+        params = df["params"].map(json.loads)
+        out = pd.DataFrame({"symbol": df["symbol"], "is_active": df["is_active"].astype(bool)})
+        for k, t in PARAM_TYPES.items():
+            col = pd.to_numeric(params.map(lambda p: p.get(k)), errors="coerce")
+            out[k] = col.astype("Int64") if t is int else col.astype(float)
+        out["params_json"] = df["params"]
+        yield out
+
+
+def export_parquet(out_dir, db_path=None, chunk_rows=CHUNK_ROWS):
+    """Writes executions.parquet and strategies.parquet, reading `chunk_rows` rows at a time."""
+    os.makedirs(out_dir, exist_ok=True)
+    cols = ", ".join(EXECUTION_SCHEMA.names)
+    with sqlite3.connect(db_path or database.DB_PATH) as conn:
+        n_exec = _write_chunks(os.path.join(out_dir, "executions.parquet"), EXECUTION_SCHEMA,
+                               pd.read_sql(f"SELECT {cols} FROM trade_execution ORDER BY rowid", conn,
+                                           chunksize=chunk_rows))
+        n_strat = _write_chunks(os.path.join(out_dir, "strategies.parquet"), STRATEGY_SCHEMA,
+                                _strategy_chunks(conn, chunk_rows))
+    return {"executions": n_exec, "strategies": n_strat}
+
+
+def import_parquet(src_dir, db_path=None, chunk_rows=CHUNK_ROWS, replace=False):
+    """Loads files written by `export_parquet` batch by batch.
+
+    Executions already in the DB are kept unless `replace`; strategies always
+    overwrite by symbol and bump the strategy version.
+    """
+    path = db_path or database.DB_PATH
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    counts = {"executions": 0, "strategies": 0}
+    with sqlite3.connect(path) as conn:
+        exec_file = os.path.join(src_dir, "executions.parquet")
+        if os.path.exists(exec_file):
+            cols = EXECUTION_SCHEMA.names
+            sql = f"{verb} INTO trade_execution ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+            before = conn.total_changes
+            for batch in pq.ParquetFile(exec_file).iter_batches(batch_size=chunk_rows, columns=cols):
+                conn.executemany(sql, zip(*(batch.column(c).to_pylist() for c in cols)))
+            counts["executions"] = conn.total_changes - before
+
+        strat_file = os.path.join(src_dir, "strategies.parquet")
+        if os.path.exists(strat_file):
+            for batch in pq.ParquetFile(strat_file).iter_batches(batch_size=chunk_rows,
+                                                                 columns=["symbol", "is_active", "params_json"]):
+                d = batch.to_pydict()
+                conn.executemany("INSERT OR REPLACE INTO strategies (symbol, params, is_active) VALUES (?, ?, ?)",
+                                 zip(d["symbol"], d["params_json"], (1 if a else 0 for a in d["is_active"])))
+                counts["strategies"] += batch.num_rows
+            if counts["strategies"]: database.bump_strategy_version(conn)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk Parquet export/import of execution history and strategies")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="DB -> Parquet")
+    exp.add_argument("--out", default="data/export")
+    imp = sub.add_parser("import", help="Parquet -> DB")
+    imp.add_argument("--src", default="data/export")
+    imp.add_argument("--replace", action="store_true", help="Overwrite executions with the same order_id")
+    for p in (exp, imp):
+        p.add_argument("--db", help="SQLite file (default: $DB_PATH)")
+        p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        res = export_parquet(args.out, args.db, args.chunk_rows)
+        print(f"📦 Exported {res['executions']} executions, {res['strategies']} strategies -> {args.out}")
+    else:
+        database.DB_PATH = args.db or database.DB_PATH
+        database.init_db()
+        res = import_parquet(args.src, args.db, args.chunk_rows, args.replace)
+        print(f"📥 Imported {res['executions']} executions, {res['strategies']} strategies from {args.src}")
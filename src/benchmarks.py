@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+from src import database
+
+
+def _fresh_db(tmp_dir, name):
+    database.DB_PATH = os.path.join(tmp_dir, name)
+    database.init_db()
+
+
+def _queue_manual_orders(n):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        conn.executemany("INSERT INTO manual_orders (symbol, qty, side, type) VALUES (?, ?, ?, ?)",
+                         [("AMD", 1.0, "buy", "market")] * n)
+
+
+def bench_write_batching(n_orders=200):
+    """Per-call commits vs. one WriteBatch for a burst of queued manual orders."""
+    original = database.DB_PATH
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: two connections + two commits per order (old process_manual_queue path)
+        _fresh_db(tmp, "per_call.db")
+        _queue_manual_orders(n_orders)
+        t0 = time.perf_counter()
+        for o_id, sym, qty, side, o_type in database.get_pending_manual_orders():
+            database.log_trade_attempt(f"per-call-{o_id}", sym, side, qty, o_type, 0.0, 12.0)
+            database.update_manual_order_status(o_id, "COMPLETED")
+        results["per_call"] = time.perf_counter() - t0
+
+        # Batched: one write-ahead claim commit + one flush commit for the whole cycle
+        _fresh_db(tmp, "batched.db")
+        _queue_manual_orders(n_orders)
+        t0 = time.perf_counter()
+        orders = database.claim_pending_manual_orders()
+        with database.WriteBatch() as batch:
+            for o_id, sym, qty, side, o_type in orders:
+                batch.log_trade_attempt(f"batched-{o_id}", sym, side, qty, o_type, 0.0, 12.0)
+                batch.update_manual_order_status(o_id, "COMPLETED")
+        results["batched"] = time.perf_counter() - t0
+    database.DB_PATH = original
+
+    print(f"📝 Write batching ({n_orders} orders)")
+    print(f"   per-call commits: {results['per_call'] * 1000:8.1f} ms")
+    print(f"   WriteBatch:       {results['batched'] * 1000:8.1f} ms "
+          f"({results['per_call'] / max(results['batched'], 1e-9):.1f}x)")
+    return results
+
+
+def bench_dispatch(n_orders=8, latency_ms=150.0, max_in_flight=4):
+    """Sequential submit_order_v2 vs. OrderDispatcher against a fake broker with injected latency."""
+    from src.sim import FakeBroker, FakeTradingClient
+    from src.dispatch import OrderDispatcher
+
+    symbols = [f"SYM{i}" for i in range(n_orders)]
+    original = database.DB_PATH
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        _fresh_db(tmp, "dispatch.db")
+
+        broker = FakeBroker(FakeTradingClient(latency_ms=latency_ms, jitter_ms=latency_ms / 5))
+        t0 = time.perf_counter()
+        for sym in symbols:
+            broker.submit_order_v2("market", symbol=sym, qty=1, side="buy",
+                                   take_profit={"limit_price": 110.0}, stop_loss={"stop_price": 95.0})
+        results["sequential"] = time.perf_counter() - t0
+
+        client = FakeTradingClient(latency_ms=latency_ms, jitter_ms=latency_ms / 5)
+        dispatcher = OrderDispatcher(FakeBroker(client), max_in_flight=max_in_flight)
+        t0 = time.perf_counter()  # prepare already sends, so time from the first one
+        for sym in symbols:
+            dispatcher.prepare("market", snapshot_px=100.0, symbol=sym, qty=1, side="buy",
+                               take_profit={"limit_price": 110.0}, stop_loss={"stop_price": 95.0})
+        sent = dispatcher.dispatch()
+        results["dispatched"] = time.perf_counter() - t0
+
+        assert all(o.ok for o in sent), [o.result for o in sent if not o.ok]
+        assert client.max_in_flight <= max_in_flight, client.max_in_flight
+        with sqlite3.connect(database.DB_PATH) as conn:
+            rows = conn.execute("SELECT COUNT(*), MAX(queue_wait_ms) FROM trade_execution "
+                                "WHERE api_latency_ms >= ?", (latency_ms,)).fetchone()
+        assert rows[0] == 2 * n_orders, rows
+    database.DB_PATH = original
+
+    print(f"🚚 Order dispatch ({n_orders} orders, {latency_ms:.0f}ms latency, {max_in_flight} in flight)")
+    print(f"   sequential:      {results['sequential'] * 1000:8.1f} ms (first-to-last spread)")
+    print(f"   OrderDispatcher: {results['dispatched'] * 1000:8.1f} ms (max queue wait {rows[1]:.0f} ms, "
+          f"peak in flight {client.max_in_flight})")
+    return results
+
+
+def bench_replay(days=80, symbols=("HOOD", "AMD", "AI", "CVNA", "PLTR")):
+    """End-to-end heart_beat throughput on synthetic bars (simulated minutes per second)."""
+    from src.replay import synthetic_bars, run_replay, print_report
+    bars = {s: synthetic_bars(s, days=days, seed=i) for i, s in enumerate(symbols)}
+    report = run_replay(bars, check=False)
+    print_report(report)
+    return report
+
+
+def bench_tca(n_orders=20000):
+    """Full TCA load vs. incremental refresh after a handful of new fills."""
+    from src.tca import TCACache
+    original = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        _fresh_db(tmp, "tca.db")
+        with database.WriteBatch() as batch:
+            for i in range(n_orders):
+                batch.log_trade_attempt(f"o{i}", ("AMD", "HOOD", "PLTR")[i % 3], "OrderSide.BUY", 10, "market",
+                                        100.0, 50.0 + i % 150, i % 40)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute("UPDATE trade_execution SET status='FILLED', fill_price=100.05, "
+                         "filled_at=datetime(submitted_at, '+2 seconds') WHERE rowid % 10 != 0")
+
+        cache = TCACache()
+        t0 = time.perf_counter()
+        cache.refresh()
+        full = time.perf_counter() - t0
+
+        for i in range(10):
+            database.update_trade_fill(f"o{i * 10}", 100.1, None)
+        t0 = time.perf_counter()
+        cache.refresh()
+        incremental = time.perf_counter() - t0
+    database.DB_PATH = original
+
+    print(f"📐 TCA ({n_orders} executions)")
+    print(f"   full load:           {full * 1000:8.1f} ms")
+    print(f"   incremental refresh: {incremental * 1000:8.1f} ms")
+    return {"full": full, "incremental": incremental}
+
+
+def bench_profiling_overhead(n_calls=1_000_000):
+    """Cost of the @profiled wrapper when profiling is off."""
+    from src import profiling
+
+    def raw(x):
+        return x + 1
+    wrapped = profiling.profiled(raw)
+    assert not profiling.is_enabled(), "unset PROFILE to measure the disabled path"
+
+    t0 = time.perf_counter()
+    for i in range(n_calls): raw(i)
+    base = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(n_calls): wrapped(i)
+    off = time.perf_counter() - t0
+
+    print(f"🔬 @profiled overhead when off ({n_calls:,} calls)")
+    print(f"   per call: {(off - base) / n_calls * 1e9:6.0f} ns")
+    return {"raw": base, "wrapped": off}
+
+
+def bench_strategy_cache(n_strategies=50, n_reads=500):
+    """get_strategies with the version-checked cache vs. reading and decoding every row."""
+    original = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        _fresh_db(tmp, "strategies.db")
+        for i in range(n_strategies):
+            database.save_strategy(f"S{i}", {"adx_trend": 25, "rsi_trend": 50, "target": 0.1, "stop": 0.05}, False)
+
+        t0 = time.perf_counter()
+        for _ in range(n_reads):
+            with sqlite3.connect(database.DB_PATH) as conn:
+                rows = conn.execute("SELECT symbol, params FROM strategies").fetchall()
+                {row[0]: json.loads(row[1]) for row in rows}
+        uncached = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(n_reads): database.get_strategies()
+        cached = time.perf_counter() - t0
+    database.DB_PATH = original
+
+    print(f"🗂️ Strategy reads ({n_strategies} strategies, {n_reads} reads)")
+    print(f"   full decode:   {uncached / n_reads * 1e3:6.3f} ms/read")
+    print(f"   version cache: {cached / n_reads * 1e3:6.3f} ms/read")
+    return {"uncached": uncached, "cached": cached}
+
+
+BENCHMARKS = {
+    "write_batching": bench_write_batching,
+    "dispatch": bench_dispatch,
+    "replay": bench_replay,
+    "tca": bench_tca,
+    "profiling_overhead": bench_profiling_overhead,
+    "strategy_cache": bench_strategy_cache,
+}
+
+
+if __name__ == "__main__":
+    # Usage: python src/benchmarks.py [name ...]
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
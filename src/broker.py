@@ -4,6 +4,7 @@ import urllib3
 import time
 import pandas as pd
 from datetime import datetime, timezone
+from alpaca.common.exceptions import APIError
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import (
     MarketOrderRequest, LimitOrderRequest, TakeProfitRequest, 
@@ -11,7 +12,8 @@ from alpaca.trading.requests import (
 )
 from alpaca.trading.enums import OrderSide, TimeInForce, OrderClass, OrderStatus, QueryOrderStatus
 from src.config import Config
-from src.database import log_trade_attempt, update_trade_fill, DB_PATH
+from src import database
+from src.database import log_trade_attempt, update_trade_fill
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -77,7 +79,7 @@ class Broker:
 
     def get_mean_latency_24h(self):
         try:
-            with sqlite3.connect(DB_PATH) as conn:
+            with sqlite3.connect(database.DB_PATH) as conn:
                 res = conn.execute("SELECT AVG(api_latency_ms) FROM trade_execution WHERE submitted_at >= datetime('now', '-24 hours')").fetchone()
                 return res[0] if res[0] else 0.0
         except: return 0.0
@@ -96,6 +98,19 @@ class Broker:
         try: return self.client.get_open_position(symbol)
         except: return None
 
+    def close_position(self, symbol):
+        try:
+            self.client.close_position(symbol)
+            return True
+        except: return False
+
+    def find_order_by_client_id(self, client_order_id):
+        """The broker's order for `client_order_id`, or None if it never arrived. Other API errors propagate."""
+        try: return self.client.get_order_by_client_id(client_order_id)
+        except APIError as e:
+            if e.status_code == 404: return None
+            raise
+
     def get_orders_for_symbol(self, symbol):
         try:
             req = GetOrdersRequest(status=QueryOrderStatus.ALL, symbols=[symbol], limit=50)
@@ -107,17 +122,55 @@ class Broker:
             return active_orders
         except: return []
 
-    def submit_order_v2(self, order_type, **kwargs):
+    def build_order_request(self, order_type, **kwargs):
+        """Validates order kwargs and builds the Alpaca request object without sending it.
+
+        `take_profit`/`stop_loss` may be given as dicts (``{"limit_price": ..}``,
+        ``{"stop_price": ..}``); either one turns the order into a bracket order.
+        Raises ValueError on anything Alpaca would reject up front.
+        """
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        if not kwargs.get('symbol'): raise ValueError("symbol is required")
+        if float(kwargs.get('qty') or 0) <= 0: raise ValueError(f"{kwargs['symbol']}: qty must be positive")
+        kwargs['side'] = OrderSide.BUY if kwargs['side'].lower() == 'buy' else OrderSide.SELL
+        kwargs['time_in_force'] = TimeInForce.GTC if kwargs.get('time_in_force', 'gtc').lower() == 'gtc' else TimeInForce.DAY
+
+        tp, sl = kwargs.pop('take_profit', None), kwargs.pop('stop_loss', None)
+        if tp or sl:
+            if tp: kwargs['take_profit'] = tp if isinstance(tp, TakeProfitRequest) else TakeProfitRequest(**tp)
+            if sl: kwargs['stop_loss'] = sl if isinstance(sl, StopLossRequest) else StopLossRequest(**sl)
+            kwargs['order_class'] = OrderClass.BRACKET
+
+        if order_type == "market": return MarketOrderRequest(**kwargs)
+        if order_type == "limit":
+            if not kwargs.get('limit_price'): raise ValueError(f"{kwargs['symbol']}: limit order needs limit_price")
+            return LimitOrderRequest(**kwargs)
+        raise ValueError(f"Unsupported order type: {order_type}")
+
+    def submit_prebuilt(self, req, order_type, batch=None, snapshot_px=0.0, queue_wait_ms=0.0, db_path=None):
+        """Sends a request from `build_order_request` and records the attempt in trade_execution.
+
+        Without a batch the row goes to `db_path` (default: the active DB).
+        """
         try:
-            kwargs['side'] = OrderSide.BUY if kwargs['side'].lower() == 'buy' else OrderSide.SELL
-            kwargs['time_in_force'] = TimeInForce.GTC if kwargs['time_in_force'].lower() == 'gtc' else TimeInForce.DAY
-            if order_type == "market": req = MarketOrderRequest(**kwargs)
-            elif order_type == "limit": req = LimitOrderRequest(**kwargs)
-            
             t0 = time.time()
             order = self.client.submit_order(req)
             latency_ms = (time.time() - t0) * 1000
-            
-            log_trade_attempt(str(order.id), kwargs['symbol'], str(kwargs['side']), kwargs['qty'], order_type, 0.0, latency_ms)
+
+            row = (str(order.id), req.symbol, str(req.side), req.qty, order_type, snapshot_px, latency_ms, queue_wait_ms)
+            if batch is not None: batch.log_trade_attempt(*row)
+            else: log_trade_attempt(*row, db_path=db_path)
             return True, order.id
-        except Exception as e: return False, str(e)
\ No newline at end of file
+        except Exception as e: return False, str(e)
+
+    def submit_order_v2(self, order_type, batch=None, db_path=None, **kwargs):
+        """Submits an order and records the attempt in trade_execution.
+
+        When a `WriteBatch` is given the execution row is buffered into it instead of
+        being committed immediately; otherwise it is written to `db_path` (default: the
+        active DB), e.g. the selected account's DB when called from the dashboard.
+        """
+        try:
+            req = self.build_order_request(order_type, **kwargs)
+        except Exception as e: return False, str(e)
+        return self.submit_prebuilt(req, order_type, batch=batch, db_path=db_path)
\ No newline at end of file
@@ -18,10 +18,24 @@ class Config:
     PAPER_URL = "https://paper-api.alpaca.markets"
     LIVE_URL = "https://api.alpaca.markets"
     DB_PATH = os.getenv("DB_PATH", "data/trading.db")
+    REPORT_URL = os.getenv("REPORT_URL")
+
+    # Supervisor mode: one worker per account, e.g. ACCOUNTS="PAPER,LIVE" or "PAPER,ALICE"
+    SUPERVISOR = os.getenv("SUPERVISOR") == "1"
+    ACCOUNTS = [a.strip().upper() for a in os.getenv("ACCOUNTS", "").split(",") if a.strip()]
+
+    @classmethod
+    def engine_accounts(cls):
+        """Accounts the supervisor runs (each with its own DB), or [] when the engine runs single-account."""
+        return (cls.ACCOUNTS or [cls.MODE]) if cls.SUPERVISOR else []
 
     @classmethod
     def get_auth(cls, mode=None):
         target = mode or cls.MODE
         if target == "LIVE":
             return cls.API_KEY_LIVE, cls.API_SECRET_LIVE, False
-        return cls.API_KEY_PAPER, cls.API_SECRET_PAPER, True
\ No newline at end of file
+        if target == "PAPER":
+            return cls.API_KEY_PAPER, cls.API_SECRET_PAPER, True
+        # Named account: APIKEY_<NAME>/SECRETKEY_<NAME>, paper unless PAPER_<NAME>=0
+        is_paper = os.getenv(f"PAPER_{target}", "1") != "0"
+        return os.getenv(f"APIKEY_{target}"), os.getenv(f"SECRETKEY_{target}"), is_paper
\ No newline at end of file
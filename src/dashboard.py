@@ -2,12 +2,16 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import time
+import json
 import psutil
 from datetime import datetime
 from src.broker import Broker
 from src.config import Config
-from src.database import get_status, update_status, get_strategies, DB_PATH
+from src import database
+from src.database import get_status, update_status, get_strategies, get_open_manual_orders, db_path_for
 from src.notifications import send_trade_notification 
+from src.tca import get_tca
+from src.profiling import list_profiles
 
 st.set_page_config(page_title="Algo Command Center", layout="wide")
 
@@ -28,13 +32,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Under the supervisor every account has its own DB; otherwise there is just the default one
+accounts = Config.engine_accounts()
+with st.sidebar:
+    account = st.selectbox("Account", accounts) if len(accounts) > 1 else (accounts[0] if accounts else None)
+db_path = db_path_for(account) if account else database.DB_PATH
+all_db_paths = [db_path_for(a) for a in accounts] or [db_path]
+
 # Initialize Broker
-broker = Broker()
+broker = Broker(account)
 
 # --- 1. SIDEBAR & AUTO-REFRESH ---
 conn_ok, conn_msg = broker.test_connection()
 with st.sidebar:
-    st.markdown(f"**MODE: {Config.MODE}**")
+    st.markdown(f"**MODE: {broker.mode}**")
     auto_refresh = st.checkbox("🔄 Live Updates (30s)", value=True)
     
     if conn_ok:
@@ -56,9 +67,12 @@ with st.sidebar:
         st.error(f"🔴 DISCONNECTED: {conn_msg}")
 
     st.divider()
-    eng = get_status("engine_running") == "1"
+    # Kill switch covers every account: STOP while any engine is running, START once all are stopped
+    eng = any(get_status("engine_running", db_path=p) == "1" for p in all_db_paths)
     if st.button("🛑 STOP" if eng else "🚀 START", use_container_width=True):
-        update_status("engine_running", "0" if eng else "1"); st.rerun()
+        for p in all_db_paths: update_status("engine_running", "0" if eng else "1", db_path=p)
+        st.rerun()
+    if len(all_db_paths) > 1: st.caption(f"Applies to all {len(all_db_paths)} accounts")
 
 # --- 2. MARKET CLOCK ---
 clock_status = broker.get_market_clock()
@@ -129,7 +143,7 @@ with t1: # ASSETS
 with t2: # STRATEGIES
     st.subheader("Active Strategy Configurations")
     try:
-        strategies = get_strategies()
+        strategies = get_strategies(db_path=db_path)
         if strategies:
             display_data = []
             for ticker, params in strategies.items():
@@ -160,7 +174,7 @@ with t3: # MANUAL TICKET
         lpx = p1.number_input("Limit $", 0.0); spx = p2.number_input("Stop $", 0.0); tif = p3.selectbox("TIF", ["gtc", "day"])
         
         if st.form_submit_button("🚀 Submit Order", use_container_width=True):
-            ok, res = broker.submit_order_v2(mtype, symbol=msym, qty=mqty, side=mside, limit_price=lpx if lpx>0 else None, time_in_force=tif)
+            ok, res = broker.submit_order_v2(mtype, db_path=db_path, symbol=msym, qty=mqty, side=mside, limit_price=lpx if lpx>0 else None, time_in_force=tif)
             if ok: 
                 st.success(f"Sent: {res}")
                 try:
@@ -172,9 +186,42 @@ with t3: # MANUAL TICKET
                 st.rerun()
             else: st.error(res)
 
+    try: queued = pd.DataFrame(get_open_manual_orders(db_path),
+                               columns=["ID", "Symbol", "Qty", "Side", "Type", "Status", "Claimed (UTC)"])
+    except Exception: queued = pd.DataFrame()
+    if not queued.empty:
+        st.caption("Order Queue")
+        unconfirmed = int((queued["Status"] == "UNCONFIRMED").sum())
+        if unconfirmed:
+            st.warning(f"{unconfirmed} order(s) UNCONFIRMED: the broker could not be checked yet. "
+                       "Verify them in Alpaca before re-entering.")
+        st.dataframe(queued, use_container_width=True, hide_index=True)
+
 with t4: # EXECUTION
+    st.subheader("📐 Transaction Cost Analysis")
+    try:
+        tca = get_tca(db_path)
+        if not tca["overall"].empty:
+            ov = tca["overall"].iloc[0]
+            k1, k2, k3, k4, k5 = st.columns(5)
+            k1.metric("Orders", f"{int(ov['orders'])}")
+            k2.metric("Fill Rate", f"{ov['fill_rate']*100:.1f}%")
+            k3.metric("Shortfall", f"${ov['shortfall_usd']:,.2f}",
+                      f"{ov['shortfall_bps']:.1f} bps" if pd.notna(ov['shortfall_bps']) else None, delta_color="inverse")
+            # Percentiles are NaN until something has filled (slippage) or been timed (latency)
+            k4.metric("Slip p50/p95", f"{ov['slip_pct_p50']:.3f}% / {ov['slip_pct_p95']:.3f}%"
+                      if pd.notna(ov['slip_pct_p50']) else "–")
+            k5.metric("API p50/p99", f"{ov['api_ms_p50']:.0f} / {ov['api_ms_p99']:.0f}ms"
+                      if pd.notna(ov['api_ms_p50']) else "–")
+            st.caption("By Symbol")
+            st.dataframe(tca["by_symbol"].round(3), use_container_width=True)
+            st.caption("By Hour (UTC)")
+            st.dataframe(tca["by_hour"].round(3), use_container_width=True)
+        else: st.info("No executions to analyze yet.")
+    except Exception as e: st.warning(f"TCA unavailable: {e}")
+
     st.subheader("⚡ Persistent History")
-    with sqlite3.connect(DB_PATH) as conn:
+    with sqlite3.connect(db_path) as conn:
         try:
             df = pd.read_sql("SELECT * FROM trade_execution ORDER BY submitted_at DESC", conn)
             st.dataframe(df, use_container_width=True, height=450)
@@ -197,10 +244,32 @@ with t5: # DEBUG
     else:
         r3.metric("API Ping (Live)", "Err", "Timeout", delta_color="inverse")
 
+    try:
+        sched = json.loads(get_status("scheduler", "{}", db_path=db_path))
+        if sched:
+            st.caption("Engine Scheduler")
+            st.dataframe(pd.DataFrame(sched).T, use_container_width=True)
+    except: pass
+
+    profiles = list_profiles()
+    if profiles:
+        st.caption("Recent Profiles (PROFILE=cprofile|sample)")
+        st.dataframe(pd.DataFrame([{
+            "Started": p["started"], "Function": p["name"], "Mode": p["mode"],
+            "Duration (s)": p["duration_s"], "Top Hotspot": p["top"][0]["func"] if p["top"] else "",
+        } for p in profiles]), use_container_width=True, hide_index=True)
+        labels = [f"{p['started']} · {p['name']}" for p in profiles]
+        pick = st.selectbox("Hotspots", range(len(profiles)), format_func=lambda i: labels[i])
+        sel = profiles[pick]
+        if sel["top"]: st.dataframe(pd.DataFrame(sel["top"]), use_container_width=True, hide_index=True)
+        if sel["sections"]: st.json(sel["sections"], expanded=False)
+        if sel["file"]: st.caption(f"File: `{sel['file']}`")
+
     st.divider()
-    act_key, _, is_paper = Config.get_auth()
+    act_key, _, is_paper = Config.get_auth(broker.mode)
     st.markdown(f"""<div class="debug-card">
-        <b>Active Mode:</b> {Config.MODE}<br>
+        <b>Active Mode:</b> {broker.mode}<br>
+        <b>Database:</b> {db_path}<br>
         <b>In-Use Key:</b> {act_key[:4]}...{act_key[-4:]}<br>
         <b>Target Endpoint:</b> {"Paper Simulator" if is_paper else "Live Exchange"}
     </div>""", unsafe_allow_html=True)
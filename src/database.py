@@ -1,10 +1,16 @@
 import sqlite3
 import os
 import json
+import time
 from datetime import datetime
 
 DB_PATH = os.getenv("DB_PATH", "data/trading.db")
 
+def db_path_for(account):
+    """Per-account DB next to DB_PATH, e.g. data/trading.db -> data/trading_live.db."""
+    root, ext = os.path.splitext(DB_PATH)
+    return f"{root}_{account.lower()}{ext or '.db'}"
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     with sqlite3.connect(DB_PATH) as conn:
@@ -19,55 +25,240 @@ def init_db():
                 symbol TEXT, side TEXT, qty REAL, order_type TEXT,
                 snapshot_price REAL, fill_price REAL, slippage_pct REAL,
                 submitted_at TEXT, filled_at TEXT,
-                api_latency_ms REAL, fill_latency_ms REAL, status TEXT
+                api_latency_ms REAL, fill_latency_ms REAL, status TEXT,
+                queue_wait_ms REAL
             )
         """)
+        # Migrate DBs created before queue_wait_ms existed
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(trade_execution)").fetchall()]
+        if "queue_wait_ms" not in cols:
+            conn.execute("ALTER TABLE trade_execution ADD COLUMN queue_wait_ms REAL")
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(manual_orders)").fetchall()]
+        if "claimed_at" not in cols:
+            conn.execute("ALTER TABLE manual_orders ADD COLUMN claimed_at TEXT")
         
         conn.execute("INSERT OR IGNORE INTO system_status (key, value) VALUES ('engine_running', '1')")
         conn.execute("INSERT OR IGNORE INTO system_status (key, value) VALUES ('api_health', 'Unknown')")
+        # Seeded from the clock so a recreated DB never reuses a version a cache has already seen
+        conn.execute("INSERT OR IGNORE INTO system_status (key, value) VALUES ('strategy_version', ?)",
+                     (str(time.time_ns()),))
         conn.commit()
 
-def update_status(key, value):
-    with sqlite3.connect(DB_PATH) as conn:
+def init_account_dbs(accounts):
+    """init_db for every account's DB (see db_path_for). Returns their paths; DB_PATH is left as it was."""
+    global DB_PATH
+    base, paths = DB_PATH, [db_path_for(a) for a in accounts]
+    try:
+        for path in paths:
+            DB_PATH = path
+            init_db()
+    finally:
+        DB_PATH = base
+    return paths
+
+def update_status(key, value, db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
         conn.execute("INSERT OR REPLACE INTO system_status (key, value) VALUES (?, ?)", (key, str(value)))
 
-def get_status(key, default="0"):
-    with sqlite3.connect(DB_PATH) as conn:
+def get_status(key, default="0", db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
         try:
             res = conn.execute("SELECT value FROM system_status WHERE key = ?", (key,)).fetchone()
             return res[0] if res else default
         except: return default
 
-def save_strategy(symbol, params, is_active):
-    with sqlite3.connect(DB_PATH) as conn:
+# Known strategy params and their types; unknown keys pass through untouched
+PARAM_TYPES = {"adx_trend": int, "rsi_trend": int, "target": float, "stop": float}
+
+# db_path -> (version, {symbol: params})
+_strategy_cache = {}
+
+def _typed_params(params):
+    return {k: PARAM_TYPES[k](v) if k in PARAM_TYPES and v is not None else v for k, v in params.items()}
+
+def _copy_strategies(strategies):
+    # Callers get plain dicts they may mutate, pickle (supervisor queues) or json.dumps; the cache stays private
+    return {sym: dict(params) for sym, params in strategies.items()}
+
+def bump_strategy_version(conn):
+    """Must run in the same transaction as the strategies write it announces."""
+    conn.execute("""
+        INSERT INTO system_status (key, value) VALUES ('strategy_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """)
+
+def seed_strategies(db_path, source=None):
+    """Copies strategies from `source` (default: DB_PATH) into an empty account DB. Returns the rows copied.
+
+    Lets a new per-account DB trade on the existing tuned params instead of idling until
+    the next tuning run. Holding flags are per account, so they start cleared.
+    """
+    source = source or DB_PATH
+    if os.path.abspath(source) == os.path.abspath(db_path) or not os.path.exists(source): return 0
+    with sqlite3.connect(db_path) as conn:
+        if conn.execute("SELECT COUNT(*) FROM strategies").fetchone()[0]: return 0
+        conn.execute("ATTACH DATABASE ? AS src", (source,))
+        try:
+            n = conn.execute("INSERT OR IGNORE INTO strategies (symbol, params, is_active) "
+                             "SELECT symbol, params, 0 FROM src.strategies").rowcount
+            if n: bump_strategy_version(conn)
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE src")
+    return n
+
+def get_strategy_version(db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
+        res = conn.execute("SELECT value FROM system_status WHERE key = 'strategy_version'").fetchone()
+        return int(res[0]) if res else 0
+
+def save_strategy(symbol, params, is_active, db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
         conn.execute("INSERT OR REPLACE INTO strategies (symbol, params, is_active) VALUES (?, ?, ?)", 
-                     (symbol, json.dumps(params), 1 if is_active else 0))
+                     (symbol, json.dumps(dict(params)), 1 if is_active else 0))
+        bump_strategy_version(conn)
 
-def delete_strategy(symbol):
-    with sqlite3.connect(DB_PATH) as conn:
+def delete_strategy(symbol, db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
         conn.execute("DELETE FROM strategies WHERE symbol = ?", (symbol,))
+        bump_strategy_version(conn)
 
-def get_strategies():
-    with sqlite3.connect(DB_PATH) as conn:
+def get_strategies(db_path=None):
+    """{symbol: params} with typed params, as fresh dicts on every call.
+
+    Served from a per-DB cache that is only reloaded when `strategy_version` in
+    system_status moves, so the usual call costs one small SELECT instead of
+    reading and json-decoding every row. Writes outside save_strategy/delete_strategy
+    must bump the version too.
+    """
+    path = db_path or DB_PATH
+    version = get_strategy_version(path)
+    cached = _strategy_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return _copy_strategies(cached[1])
+    # Version is read before the rows, so a concurrent write can only make this entry stale-by-version
+    with sqlite3.connect(path) as conn:
         rows = conn.execute("SELECT symbol, params FROM strategies").fetchall()
-        return {row[0]: json.loads(row[1]) for row in rows}
+    strategies = {row[0]: _typed_params(json.loads(row[1])) for row in rows}
+    _strategy_cache[path] = (version, strategies)
+    return _copy_strategies(strategies)
+
+# A flush that hits "database is locked" is retried this many times before the cycle gives up
+FLUSH_RETRIES = int(os.getenv("FLUSH_RETRIES", "4"))
+FLUSH_BACKOFF_S = float(os.getenv("FLUSH_BACKOFF_S", "0.25"))
+
+_UPDATE_MANUAL_ORDER_SQL = "UPDATE manual_orders SET status=? WHERE id=?"
+_LOG_TRADE_SQL = """
+    INSERT OR IGNORE INTO trade_execution
+    (order_id, symbol, side, qty, order_type, snapshot_price, submitted_at, api_latency_ms, queue_wait_ms, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'NEW')
+"""
+
+def _trade_attempt_row(order_id, symbol, side, qty, type, snapshot_px, latency_ms, queue_wait_ms=0.0):
+    return (str(order_id), symbol, side, float(qty), type, float(snapshot_px),
+            datetime.utcnow().isoformat(), float(latency_ms), float(queue_wait_ms))
 
 def get_pending_manual_orders():
     with sqlite3.connect(DB_PATH) as conn:
         return conn.execute("SELECT id, symbol, qty, side, type FROM manual_orders WHERE status='PENDING'").fetchall()
 
-def update_manual_order_status(o_id, status):
+def claim_pending_manual_orders():
+    """Moves every PENDING manual order to SUBMITTING in one transaction and returns them.
+
+    This is the write-ahead step: the claim is committed before anything is sent to the
+    broker, so a crash mid-cycle leaves the order in SUBMITTING instead of PENDING and
+    the next cycle will not submit it a second time.
+    """
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("UPDATE manual_orders SET status=? WHERE id=?", (status, o_id))
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("SELECT id, symbol, qty, side, type FROM manual_orders WHERE status='PENDING'").fetchall()
+        conn.executemany("UPDATE manual_orders SET status='SUBMITTING', claimed_at=datetime('now') WHERE id=?",
+                         [(r[0],) for r in rows])
+        return rows
+
+def get_stale_manual_orders(max_age_s):
+    """Claimed orders whose outcome was never recorded: SUBMITTING for over `max_age_s`, or UNCONFIRMED.
 
-def log_trade_attempt(order_id, symbol, side, qty, type, snapshot_px, latency_ms):
+    Rows without `claimed_at` predate client order ids and cannot be looked up, so they are left alone.
+    """
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""
-            INSERT OR IGNORE INTO trade_execution 
-            (order_id, symbol, side, qty, order_type, snapshot_price, submitted_at, api_latency_ms, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'NEW')
-        """, (str(order_id), symbol, side, float(qty), type, float(snapshot_px), 
-              datetime.utcnow().isoformat(), float(latency_ms)))
+        return conn.execute("""
+            SELECT id, symbol, qty, side, type FROM manual_orders
+            WHERE claimed_at IS NOT NULL
+              AND (status='UNCONFIRMED' OR (status='SUBMITTING' AND claimed_at <= datetime('now', ?)))
+        """, (f"-{int(max_age_s)} seconds",)).fetchall()
+
+def get_open_manual_orders(db_path=None):
+    """Manual orders not yet resolved (PENDING, SUBMITTING or UNCONFIRMED), newest first."""
+    with sqlite3.connect(db_path or DB_PATH) as conn:
+        return conn.execute("SELECT id, symbol, qty, side, type, status, claimed_at FROM manual_orders "
+                            "WHERE status IN ('PENDING', 'SUBMITTING', 'UNCONFIRMED') ORDER BY id DESC").fetchall()
+
+def recover_inflight_manual_orders():
+    """Flags orders left in SUBMITTING by a crash so they are reconciled by hand, never resent."""
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("UPDATE manual_orders SET status='UNCONFIRMED' WHERE status='SUBMITTING'").rowcount
+
+def update_manual_order_status(o_id, status):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(_UPDATE_MANUAL_ORDER_SQL, (status, o_id))
+
+def log_trade_attempt(order_id, symbol, side, qty, type, snapshot_px, latency_ms, queue_wait_ms=0.0, db_path=None):
+    with sqlite3.connect(db_path or DB_PATH) as conn:
+        conn.execute(_LOG_TRADE_SQL, _trade_attempt_row(order_id, symbol, side, qty, type, snapshot_px, latency_ms,
+                                                        queue_wait_ms))
+
+class WriteBatch:
+    """Buffers the writes of one engine cycle and commits them in a single transaction.
+
+    Exposes the same write calls as the module-level functions, so callers can pass a
+    batch wherever they would otherwise write straight to the DB. Used as a context
+    manager it flushes on exit, including when the cycle raised, so orders that did
+    reach the broker are always recorded; a locked DB is retried with backoff first.
+    """
+
+    def __init__(self):
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush_with_retry()
+        return False
+
+    def update_manual_order_status(self, o_id, status):
+        self._ops.append((_UPDATE_MANUAL_ORDER_SQL, (status, o_id)))
+
+    def log_trade_attempt(self, order_id, symbol, side, qty, type, snapshot_px, latency_ms, queue_wait_ms=0.0):
+        row = _trade_attempt_row(order_id, symbol, side, qty, type, snapshot_px, latency_ms, queue_wait_ms)
+        self._ops.append((_LOG_TRADE_SQL, row))
+
+    def flush(self):
+        """Writes all buffered statements in one transaction. Returns the number written."""
+        if not self._ops: return 0
+        ops, self._ops = self._ops, []
+        try:
+            with sqlite3.connect(DB_PATH) as conn:
+                for sql, params in ops:
+                    conn.execute(sql, params)
+        except Exception:
+            # Keep the rows so a retry (or the next cycle) can still persist them
+            self._ops = ops + self._ops
+            raise
+        return len(ops)
+
+    def flush_with_retry(self, retries=FLUSH_RETRIES, backoff_s=FLUSH_BACKOFF_S):
+        """`flush`, retried with exponential backoff while SQLite reports a lock or busy error."""
+        for attempt in range(retries + 1):
+            try: return self.flush()
+            except sqlite3.OperationalError as e:
+                if attempt == retries: raise
+                print(f"⚠️ Write batch flush failed ({e}), retry {attempt + 1}/{retries}")
+                time.sleep(backoff_s * 2 ** attempt)
 
 # --- CRITICAL FIX: Missing functions added below ---
 
@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.database import WriteBatch
+
+MAX_IN_FLIGHT = int(os.getenv("DISPATCH_MAX_IN_FLIGHT", "4"))
+
+
+class PreparedOrder:
+    """An order validated and built ahead of time, ready to be sent as-is."""
+
+    def __init__(self, symbol, order_type, request, snapshot_px=0.0):
+        self.symbol = symbol
+        self.order_type = order_type
+        self.request = request
+        self.snapshot_px = snapshot_px
+        self.queued_at = time.perf_counter()
+        self.future = None
+        self.ok = None
+        self.result = None
+        self.queue_wait_ms = 0.0
+
+
+class OrderDispatcher:
+    """Submits independent orders concurrently, capped at `max_in_flight` requests.
+
+    `prepare` validates and builds the request, then hands it straight to the capped
+    pool, so an entry goes out while later symbols are still being evaluated. `dispatch`
+    waits for everything prepared so far. Each execution row records the broker
+    round-trip (`api_latency_ms`) and the time from `prepare` until a slot was free
+    (`queue_wait_ms`). Rows go through one `WriteBatch` per dispatch.
+    """
+
+    def __init__(self, broker, max_in_flight=MAX_IN_FLIGHT):
+        self.broker = broker
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._pending = []
+        self._pool = None
+        self._batch = WriteBatch()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def prepare(self, order_type, snapshot_px=0.0, **kwargs):
+        """Validates an order and starts sending it. Returns (ok, PreparedOrder or error message)."""
+        try:
+            req = self.broker.build_order_request(order_type, **kwargs)
+        except Exception as e:
+            return False, str(e)
+        prepared = PreparedOrder(kwargs.get('symbol'), order_type, req, snapshot_px)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="dispatch")
+        prepared.future = self._pool.submit(self._send, prepared, self._batch)
+        self._pending.append(prepared)
+        return True, prepared
+
+    def _send(self, prepared, batch):
+        prepared.queue_wait_ms = (time.perf_counter() - prepared.queued_at) * 1000
+        prepared.ok, prepared.result = self.broker.submit_prebuilt(
+            prepared.request, prepared.order_type, batch=batch,
+            snapshot_px=prepared.snapshot_px, queue_wait_ms=prepared.queue_wait_ms)
+        return prepared
+
+    def dispatch(self):
+        """Waits for every prepared order and returns them with `ok`/`result` filled in."""
+        orders, self._pending = self._pending, []
+        pool, self._pool = self._pool, None
+        batch, self._batch = self._batch, WriteBatch()
+        if not orders: return []
+
+        with batch:
+            for o in orders:
+                try: o.future.result()
+                except Exception as e: print(f"Dispatch Error: {e}")
+            pool.shutdown()
+        return orders
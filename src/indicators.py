@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from ta.trend import ADXIndicator
+from ta.momentum import RSIIndicator
+
+# Shared by the live engine (`main.compute_signals`) and the tuner (`tuner.precompute_indicators`),
+# so a backtest scores exactly the signals the engine trades on
+WINDOW = 14
+RSI_EXIT = 40  # close a held position when the last closed 2H bar's RSI drops below this
+# History the engine downloads. RSI/ADX are Wilder-smoothed, so a short window still carries its
+# starting seed: 10 days (~40 2H bars) left the live values several points off the backtest's.
+# ~60 days (~170 2H bars) converges to the full-history values.
+LOOKBACK_DAYS = 60
+
+_OHLCV = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def resample_2h(df):
+    """1H bars -> 2H bars. origin='start_day' puts the 9:30 bar alone in 08:00, then 10:00, 12:00, 14:00."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    # Bucket on exchange wall-clock time: on a tz-aware index the grid is fixed in UTC from the first
+    # day, so windows starting on either side of a DST change would disagree about every later bar
+    tz = df.index.tz
+    if tz is not None: df = df.tz_localize(None)
+    df_2h = df.resample('2h', origin='start_day').apply(_OHLCV).dropna()
+    return df_2h.tz_localize(tz) if tz is not None else df_2h
+
+
+def add_indicators(df_2h):
+    """Returns a copy of `df_2h` with RSI and ADX columns."""
+    df_2h = df_2h.copy()
+    df_2h['RSI'] = RSIIndicator(df_2h['Close'], window=WINDOW).rsi()
+    # ta fills the ADX warm-up with 0.0; NaN keeps those bars out of signals and the tuner's dropna
+    df_2h['ADX'] = ADXIndicator(df_2h['High'], df_2h['Low'], df_2h['Close'], window=WINDOW).adx().replace(0.0, np.nan)
+    return df_2h
@@ -1,15 +1,41 @@
 import schedule
 import time
+import queue
+import argparse
 import threading
+import multiprocessing as mp
 import numpy as np
 import yfinance as yf
 import pandas as pd
 from datetime import datetime
-from ta.trend import ADXIndicator
-from ta.momentum import RSIIndicator
-from src.database import init_db, get_strategies, get_status, update_status, get_pending_manual_orders, update_manual_order_status, get_unfilled_executions, update_trade_fill
+from src import database
+from src.config import Config
+from src.database import (
+    init_db, init_account_dbs, seed_strategies, db_path_for, get_strategies, get_status, update_status,
+    claim_pending_manual_orders, recover_inflight_manual_orders, get_stale_manual_orders, get_unfilled_executions, update_trade_fill, WriteBatch
+)
 from src.broker import Broker
+from src.dispatch import OrderDispatcher
 from src.notifications import send_trade_notification
+from src.indicators import WINDOW, RSI_EXIT, LOOKBACK_DAYS, resample_2h, add_indicators
+from src.scheduler import EngineScheduler, mark_alive, liveness_path, stale_liveness, status_reporter
+from src import profiling
+from src.profiling import profiled
+
+# Engine task cadences (seconds). Every task runs on a grid pinned to whole wall-clock
+# minutes, offset by its phase, so the three never start together: manual queue at
+# :00, order sync at :02, strategies at :05. Bars close on the half hour (1H bars at
+# hh:30, 2H bars at 10:30/12:30/14:30 ET), which is always a slot on that grid, so the
+# first strategy run after a close starts 5s later. If the data feed has not published
+# the bar by then, the run after that (60s later) picks it up.
+SYNC_EVERY, SYNC_PHASE, SYNC_TIMEOUT = 60, 2, 30
+MANUAL_EVERY, MANUAL_PHASE, MANUAL_TIMEOUT = 15, 0, 30
+# Claimed manual orders still SUBMITTING after this long are looked up at the broker
+MANUAL_STALE_S = 120
+STRATEGY_EVERY, STRATEGY_PHASE, STRATEGY_TIMEOUT = 60, 5, 50
+# Supervisor: how often worker liveness is combined, and how old a worker's last heartbeat may get
+LIVENESS_EVERY, LIVENESS_PHASE = 30, 20
+WORKER_STALE_S = 3 * STRATEGY_EVERY
 
 # --- ASYNC TUNER LOGIC ---
 def _run_tuner_job():
@@ -48,27 +74,81 @@ def sync_order_statuses(broker):
     except Exception as e: print(f"Sync Error: {e}")
 
 # --- TRADING LOGIC ---
+def _manual_client_id(o_id):
+    return f"manual-{o_id}"
+
+def reconcile_manual_orders(broker, max_age_s=MANUAL_STALE_S):
+    """Resolves claimed manual orders whose result was never written, by their client order id.
+
+    Found at the broker -> execution row + COMPLETED. Unknown to the broker -> FAILED
+    (it never left, and is not resent). A failed lookup leaves it UNCONFIRMED for the next pass.
+    """
+    stale = get_stale_manual_orders(max_age_s)
+    if not stale: return
+    with WriteBatch() as batch:
+        for o_id, sym, qty, side, o_type in stale:
+            try: order = broker.find_order_by_client_id(_manual_client_id(o_id))
+            except Exception as e:
+                print(f"Reconcile Error ({sym} #{o_id}): {e}")
+                batch.update_manual_order_status(o_id, 'UNCONFIRMED')
+                continue
+            if order is None:
+                batch.update_manual_order_status(o_id, 'FAILED')
+            else:
+                # Round-trip time is unknown here; NaN is stored as NULL and kept out of the latency stats
+                batch.log_trade_attempt(str(order.id), sym, str(order.side), qty, o_type, 0.0, float("nan"))
+                batch.update_manual_order_status(o_id, 'COMPLETED')
+            print(f"🧾 Reconciled manual order #{o_id} ({sym}): {'not at broker' if order is None else order.id}")
+
 def process_manual_queue(broker):
     try:
-        orders = get_pending_manual_orders()
-        for o in orders:
-            o_id, sym, qty, side, o_type = o
-            ok, msg = broker.submit_order_v2(o_type, symbol=sym, qty=qty, side=side)
-            status = 'COMPLETED' if ok else 'FAILED'
-            update_manual_order_status(o_id, status)
+        reconcile_manual_orders(broker)
+        # Claim first (committed), submit, then record all results in one transaction
+        orders = claim_pending_manual_orders()
+        if not orders: return
+        with WriteBatch() as batch:
+            for o in orders:
+                o_id, sym, qty, side, o_type = o
+                ok, msg = broker.submit_order_v2(o_type, batch=batch, symbol=sym, qty=qty, side=side,
+                                                 client_order_id=_manual_client_id(o_id))
+                status = 'COMPLETED' if ok else 'FAILED'
+                batch.update_manual_order_status(o_id, status)
     except Exception as e:
         print(f"Manual Queue Error: {e}")
 
-def heart_beat():
-    with open("/tmp/heartbeat", "w") as f: f.write(str(time.time()))
-    broker = Broker()
+def get_recent_bars(sym):
+    """1H bars for the last LOOKBACK_DAYS (the live data source; the replay harness swaps it out)."""
+    return yf.download(sym, period=f"{LOOKBACK_DAYS}d", interval="1h", progress=False)
+
+def compute_signals(df):
+    """Returns (rsi, adx) of the last *closed* 2H bar, or None if there is not enough data."""
+    if df.empty or len(df) < WINDOW: return None
+    try:
+        df_2h = resample_2h(df)
+        if len(df_2h) < WINDOW: return None
+
+        ind = add_indicators(df_2h)
+        return ind['RSI'].iloc[-2], ind['ADX'].iloc[-2]
+    except: return None
+
+def check_connection(broker):
     ok, msg = broker.test_connection()
     update_status("api_health", msg)
-    if not ok: return
+    return ok
+
+@profiled
+def heart_beat(broker=None, fetch_bars=get_recent_bars, signals=None):
+    """One full engine cycle: order sync, manual queue, then strategy evaluation."""
+    broker = broker or Broker()
+    if not check_connection(broker): return
 
     sync_order_statuses(broker)
     process_manual_queue(broker)
+    evaluate_strategies(broker, fetch_bars, signals)
 
+@profiled
+def evaluate_strategies(broker, fetch_bars=get_recent_bars, signals=None):
+    """Signal evaluation and entries/exits. `signals` ({sym: (rsi, adx)}) skips fetching when a producer already did it."""
     if get_status("engine_running") == "0": return
     if "Closed" in broker.get_market_clock(): return
 
@@ -81,46 +161,171 @@ def heart_beat():
     if len(strategies) > 0: target_per_stock = equity / len(strategies)
     else: target_per_stock = 0
 
-    for sym, p in strategies.items():
-        df = yf.download(sym, period="10d", interval="1h", progress=False)
-        if df.empty or len(df) < 14: continue
-        
+    dispatcher = OrderDispatcher(broker)
+    try:
+        for sym, p in strategies.items():
+            sig = signals.get(sym) if signals is not None else compute_signals(fetch_bars(sym))
+            if sig is None: continue
+            confirmed_rsi, confirmed_adx = sig
+
+            pos = broker.is_holding(sym)
+            if not pos:
+                if confirmed_adx > p.get('adx_trend', 25) and confirmed_rsi > p.get('rsi_trend', 50):
+                    price = broker.get_latest_price(sym)
+                    if price and cash > price:
+                        qty = int(min(cash, target_per_stock) / price)
+                        if qty >= 1:
+                            tp = round(price * (1 + p['target']), 2)
+                            sl = round(price * (1 - p['stop']), 2)
+                            ok, res = dispatcher.prepare("market", snapshot_px=price, symbol=sym, qty=qty, side="buy",
+                                                         take_profit={"limit_price": tp},
+                                                         stop_loss={"stop_price": sl})
+                            if ok: cash -= (qty * price)
+                            else: print(f"Order Rejected {sym}: {res}")
+            else:
+                if confirmed_rsi < RSI_EXIT:
+                    broker.close_position(sym)
+                    send_trade_notification()
+    finally:
+        # Entries were sent as soon as they were prepared; this waits for them and records the rows
+        sent = dispatcher.dispatch()
+    for o in sent:
+        if not o.ok: print(f"Order Failed {o.symbol}: {o.result}")
+    if any(o.ok for o in sent):
+        send_trade_notification()
+
+# --- SUPERVISOR (one worker process per account, shared market data) ---
+def _publish(q, item):
+    """Non-blocking put that replaces a stale snapshot instead of queueing behind it."""
+    try: q.put_nowait(item)
+    except queue.Full:
+        try: q.get_nowait()
+        except queue.Empty: pass
+        try: q.put_nowait(item)
+        except queue.Full: pass
+
+def produce_signals(accounts):
+    """Fetches bars and computes indicators once for the union of all accounts' symbols."""
+    if "Closed" in Broker(accounts[0]).get_market_clock(): return {}
+    symbols = set()
+    for acct in accounts:
+        try: symbols.update(get_strategies(db_path=db_path_for(acct)))
+        except Exception as e: print(f"Producer Error ({acct}): {e}")
+    snapshot = {}
+    for sym in sorted(symbols):
+        sig = compute_signals(get_recent_bars(sym))
+        if sig is not None: snapshot[sym] = sig
+    return snapshot
+
+def _account_worker(account, signal_q):
+    """Worker process: runs heart_beat for one account against its own DB."""
+    Config.MODE = account
+    database.DB_PATH = db_path_for(account)
+    init_db()
+    stale = recover_inflight_manual_orders()
+    if stale: print(f"⚠️ [{account}] {stale} manual order(s) were in flight at last shutdown, marked UNCONFIRMED")
+    print(f"👷 [{account}] Worker started on {database.DB_PATH}")
+    while True:
+        snapshot = signal_q.get()
+        # Coalesce: if we fell behind, act on the freshest snapshot only
+        while True:
+            try: snapshot = signal_q.get_nowait()
+            except queue.Empty: break
         try:
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-            df_2h = df.resample('2h', origin='start_day').apply(logic).dropna()
-            if len(df_2h) < 14: continue 
-
-            confirmed_rsi = RSIIndicator(df_2h['Close']).rsi().iloc[-2]
-            confirmed_adx = ADXIndicator(df_2h['High'], df_2h['Low'], df_2h['Close']).adx().iloc[-2]
-        except: continue
-
-        pos = broker.is_holding(sym)
-        if not pos:
-            if confirmed_adx > p.get('adx_trend', 25) and confirmed_rsi > p.get('rsi_trend', 50):
-                price = broker.get_latest_price(sym)
-                if price and cash > price:
-                    qty = int(min(cash, target_per_stock) / price)
-                    if qty >= 1:
-                        tp = round(price * (1 + p['target']), 2)
-                        sl = round(price * (1 - p['stop']), 2)
-                        success, _ = broker.submit_order_v2("market", symbol=sym, qty=qty, side="buy", 
-                                                          take_profit={"limit_price": tp}, 
-                                                          stop_loss={"stop_price": sl})
-                        if success:
-                            send_trade_notification()
-                            cash -= (qty * price) 
-        else:
-            if confirmed_rsi < 40:
-                broker.close_position(sym)
-                send_trade_notification()
+            heart_beat(broker=Broker(account), signals=snapshot)
+            mark_alive(liveness_path(account))
+        except Exception as e: print(f"❌ [{account}] Heartbeat Error: {e}")
+
+def _run_shared_tuner_job(accounts):
+    print("🧠 Starting Scheduled Weekly Tuning (shared)...")
+    try:
+        from src.tuner import optimize_stock, TICKERS
+        targets = {db_path_for(a): Broker(a) for a in accounts}
+        for t in TICKERS:
+            optimize_stock(t, None, accounts=targets)
+        print("✅ Weekly Tuning Complete.")
+    except Exception as e:
+        print(f"❌ Tuning Error: {e}")
+
+def run_supervisor(accounts):
+    ctx = mp.get_context("spawn")
+    queues = {a: ctx.Queue(maxsize=1) for a in accounts}
+    workers = {}
+
+    def ensure_workers():
+        for acct in accounts:
+            w = workers.get(acct)
+            if w is not None and w.is_alive(): continue
+            if w is not None: print(f"♻️ Worker {acct} exited ({w.exitcode}), restarting")
+            workers[acct] = ctx.Process(target=_account_worker, args=(acct, queues[acct]),
+                                        name=f"worker-{acct.lower()}", daemon=True)
+            workers[acct].start()
+
+    def tick():
+        ensure_workers()
+        try: snapshot = produce_signals(accounts)
+        except Exception as e:
+            print(f"Producer Error: {e}")
+            snapshot = {}
+        for q in queues.values(): _publish(q, snapshot)
+
+    for acct, path in zip(accounts, init_account_dbs(accounts)):
+        seeded = seed_strategies(path)
+        if seeded: print(f"🌱 [{acct}] Seeded {seeded} strategies from {database.DB_PATH}")
+
+    def check_workers():
+        # /tmp/heartbeat only stays fresh while every worker is; one hung account fails the healthcheck
+        stale = stale_liveness([liveness_path(a) for a in accounts], WORKER_STALE_S)
+        if stale: raise RuntimeError(f"no completed heartbeat in {WORKER_STALE_S}s: {', '.join(stale)}")
+
+    def update_all(key, value):
+        for acct in accounts: update_status(key, value, db_path=db_path_for(acct))
+
+    print(f"🚀 Algo-Trader Supervisor Starting ({', '.join(accounts)})...")
+    ensure_workers()
+    sched = EngineScheduler(on_stats=status_reporter(update_all))
+    sched.add("produce", tick, STRATEGY_EVERY, STRATEGY_PHASE, STRATEGY_TIMEOUT)
+    sched.add("liveness", check_workers, LIVENESS_EVERY, LIVENESS_PHASE, liveness=True)
+    schedule.every().friday.at("23:00").do(
+        lambda: threading.Thread(target=_run_shared_tuner_job, args=(accounts,)).start())
+    sched.run_forever(on_tick=schedule.run_pending)
+
+def _sync_task():
+    sync_order_statuses(Broker())
+
+def _manual_task():
+    process_manual_queue(Broker())
+
+def _strategy_task():
+    broker = Broker()
+    if not check_connection(broker): raise ConnectionError("Broker API unreachable")
+    evaluate_strategies(broker)
+
+def build_scheduler():
+    sched = EngineScheduler(on_stats=status_reporter(update_status))
+    sched.add("sync", _sync_task, SYNC_EVERY, SYNC_PHASE, SYNC_TIMEOUT)
+    sched.add("manual_queue", _manual_task, MANUAL_EVERY, MANUAL_PHASE, MANUAL_TIMEOUT)
+    sched.add("strategy", _strategy_task, STRATEGY_EVERY, STRATEGY_PHASE, STRATEGY_TIMEOUT, liveness=True)
+    return sched
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Algo-Trader engine")
+    parser.add_argument("--supervisor", action="store_true", default=Config.SUPERVISOR,
+                        help="Run one worker process per account with a shared data producer")
+    parser.add_argument("--accounts", default=",".join(Config.ACCOUNTS),
+                        help="Comma-separated accounts for --supervisor (default: $ACCOUNTS)")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="Write per-run profiles under data/profiles (same as PROFILE=...)")
+    args = parser.parse_args()
+    if args.profile: profiling.enable(args.profile)
+
+    if args.supervisor:
+        accounts = [a.strip().upper() for a in args.accounts.split(",") if a.strip()] or [Config.MODE]
+        run_supervisor(accounts)
+
     init_db()
+    stale = recover_inflight_manual_orders()
+    if stale: print(f"⚠️ {stale} manual order(s) were in flight at last shutdown, marked UNCONFIRMED")
     print("🚀 Algo-Trader (2H Strategy + Async Tuner) Starting...")
-    schedule.every(1).minutes.do(heart_beat)
     schedule.every().friday.at("23:00").do(schedule_async_tuner)
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+    build_scheduler().run_forever(on_tick=schedule.run_pending)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+TOP_N = 15
+
+_MODES = {"1": "cprofile", "true": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+_mode = _MODES.get(os.getenv("PROFILE", "").strip().lower())
+_local = threading.local()
+_cprofile_lock = threading.Lock()
+
+
+def enable(mode="cprofile"):
+    """Turns profiling on for this process and any worker it spawns."""
+    global _mode
+    _mode = _MODES.get(str(mode).lower(), "cprofile")
+    os.environ["PROFILE"] = _mode
+
+
+def is_enabled():
+    return _mode is not None
+
+
+def profiled(fn):
+    """Profiles each outermost call of `fn` when PROFILE is set; a plain call otherwise.
+
+    Calls nested inside another profiled call only add their wall time to the outer
+    run's `sections`, so `objective` inside `optimize_stock` doesn't write 50 files.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _mode is None: return fn(*args, **kwargs)
+        session = getattr(_local, "session", None)
+        if session is not None:
+            t0 = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: session.section(fn.__name__, time.perf_counter() - t0)
+
+        session = _Session(fn.__name__, _mode)
+        _local.session = session
+        session.start()
+        try: return fn(*args, **kwargs)
+        finally:
+            session.stop()
+            _local.session = None
+            try: session.write()
+            except Exception as e: print(f"Profile Write Error: {e}")
+    return wrapper
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's stack every `interval_s` into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval_s):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                if frame.f_code.co_filename != __file__:  # hide the decorator's own frames
+                    stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack: self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class _Session:
+    def __init__(self, name, mode):
+        self.name = name
+        self.mode = mode
+        self.sections = {}
+        self._prof = None
+        self._sampler = None
+
+    def section(self, name, seconds):
+        s = self.sections.setdefault(name, {"calls": 0, "total_s": 0.0})
+        s["calls"] += 1
+        s["total_s"] += seconds
+
+    def start(self):
+        self.started = datetime.now()
+        if self.mode == "cprofile":
+            # One deterministic profiler at a time; concurrent runs fall back to timing only
+            if _cprofile_lock.acquire(blocking=False):
+                self._prof = cProfile.Profile()
+                self._prof.enable()
+            else: self.mode = "timing"
+        elif self.mode == "sample":
+            self._sampler = _Sampler(threading.get_ident(), SAMPLE_INTERVAL_MS / 1000)
+            self._sampler.start()
+        self._t0 = time.perf_counter()
+
+    def stop(self):
+        self.duration_s = time.perf_counter() - self._t0
+        if self._prof is not None:
+            self._prof.disable()
+            _cprofile_lock.release()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def _top_cprofile(self, path):
+        self._prof.dump_stats(path)
+        stats = pstats.Stats(self._prof).stats
+        rows = sorted(stats.items(), key=lambda kv: kv[1][2], reverse=True)[:TOP_N]
+        return [{"func": f"{fn} ({os.path.basename(file)}:{line})", "calls": nc,
+                 "tottime_s": round(tt, 4), "cumtime_s": round(ct, 4)}
+                for (file, line, fn), (cc, nc, tt, ct, callers) in rows]
+
+    def _top_samples(self, path):
+        with open(path, "w") as f:
+            for stack, n in self._sampler.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        total = sum(self._sampler.stacks.values()) or 1
+        leaves = Counter()
+        for stack, n in self._sampler.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        return [{"func": fn, "samples": n, "pct": round(n / total * 100, 1)} for fn, n in leaves.most_common(TOP_N)]
+
+    def write(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(PROFILE_DIR, f"{self.started:%Y%m%d-%H%M%S-%f}_{self.name}_{os.getpid()}")
+        summary = {"name": self.name, "mode": self.mode, "started": self.started.isoformat(timespec="seconds"),
+                   "duration_s": round(self.duration_s, 4), "file": None, "top": [],
+                   "sections": {k: {"calls": v["calls"], "total_s": round(v["total_s"], 4)}
+                                for k, v in self.sections.items()}}
+        if self._prof is not None:
+            summary["file"] = stem + ".pstats"
+            summary["top"] = self._top_cprofile(summary["file"])
+        elif self._sampler is not None:
+            summary["file"] = stem + ".collapsed"
+            summary["top"] = self._top_samples(summary["file"])
+        with open(stem + ".json", "w") as f:
+            json.dump(summary, f)
+        _prune()
+
+
+def _prune():
+    runs = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".json"))
+    for old in runs[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        stem = old[:-len(".json")]
+        for ext in (".json", ".pstats", ".collapsed"):
+            try: os.remove(os.path.join(PROFILE_DIR, stem + ext))
+            except FileNotFoundError: pass
+
+
+def list_profiles(limit=20):
+    """Summaries of the most recent runs, newest first (for the dashboard)."""
+    if not os.path.isdir(PROFILE_DIR): return []
+    out = []
+    for name in sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".json")), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f: out.append(json.load(f))
+        except Exception: continue
+    return out
@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from src import database
+from src.sim import SimClock, SimMarket, SimTradingClient, SimBroker
+from src.indicators import LOOKBACK_DAYS, resample_2h
+
+DEFAULT_PARAMS = {"adx_trend": 25, "rsi_trend": 50, "target": 0.10, "stop": 0.05}
+
+
+# --- DATA ---
+def synthetic_bars(symbol, days=90, seed=0, start="2024-01-02", price=100.0, vol=0.01):
+    """Random-walk NYSE-hours 1H bars (9:30..15:30 ET), same shape as `tuner.get_stock_data`.
+
+    A slow sine drift is layered on the noise so ADX sees trending stretches.
+    """
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range(start, periods=days)
+    idx = pd.DatetimeIndex([d + pd.Timedelta(hours=9, minutes=30 + 60 * h) for d in sessions for h in range(7)])
+    idx = idx.tz_localize("America/New_York")
+
+    n = len(idx)
+    trend = vol * 0.6 * np.sin(np.arange(n) / 15 + rng.uniform(0, 2 * np.pi))
+    closes = price * np.exp(np.cumsum(rng.normal(0, vol, n) + trend))
+    opens = np.concatenate([[price], closes[:-1]]) * np.exp(rng.normal(0, vol / 4, n))
+    spread = np.abs(rng.normal(0, vol, n)) * closes
+    highs = np.maximum(opens, closes) + spread
+    lows = np.minimum(opens, closes) - spread
+    volume = rng.integers(100_000, 1_000_000, n).astype(float)
+    return pd.DataFrame({"Open": opens, "High": highs, "Low": lows, "Close": closes, "Volume": volume}, index=idx)
+
+
+def load_bars(path):
+    """Recorded 1H bars from a CSV written by `record_bars` (or any yfinance CSV export)."""
+    df = pd.read_csv(path, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert("America/New_York")
+    return df[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+
+
+def record_bars(symbols, out_dir):
+    """Downloads 1y of 1H bars per symbol into `out_dir/<SYMBOL>.csv` for later replays."""
+    from src.tuner import get_stock_data
+    os.makedirs(out_dir, exist_ok=True)
+    for sym in symbols:
+        df = get_stock_data(sym)
+        if df is not None:
+            df.to_csv(os.path.join(out_dir, f"{sym}.csv"))
+            print(f"💾 Recorded {sym}: {len(df)} bars")
+
+
+# --- DECISION CHECK ---
+# Engine and backtest share bars, indicators, warm-up and thresholds (src/indicators.py). What is
+# left differs by design, because the engine acts on every hourly heartbeat and the backtest only
+# at 2H bar opens:
+#   * after a bracket exit in the first hour of a 2H bar, the engine can re-enter in the second
+#     hour at that hour's open; the backtest re-enters at the next 2H open
+#   * the engine's bracket is live from the fill, so it can exit inside the entry bar; the
+#     backtest checks TP/SL from the following bar
+#   * the engine checks TP/SL per 1H bar in order; the backtest sees one 2H high/low and
+#     tests the stop first
+# Each of these moves a decision by one 2H bar, and the changed entry price can shift the next
+# exit too. So decisions one bar apart count as matches, and the check fails below MIN_AGREEMENT.
+MIN_AGREEMENT = 0.8
+MATCH_TOLERANCE_BARS = 1
+
+
+def _bucket(ts, buckets):
+    i = int(buckets.searchsorted(ts, side='right')) - 1
+    return buckets[i] if i >= 0 else None
+
+
+def reference_decisions(bars, params, start, end):
+    """Entries/exits `tuner.backtest` takes on the same bars, keyed by 2H bar."""
+    from src.tuner import precompute_indicators, backtest
+    ref = set()
+    for sym, df in bars.items():
+        p = params[sym]
+        df_2h = precompute_indicators(df)
+        if df_2h is None: continue
+        # Indicators see the full history, but trading starts flat at `start` like the replay
+        window = df_2h[(df_2h.index >= start) & (df_2h.index < end)]
+        if window.empty: continue
+        trades = []
+        backtest(window, p['adx_trend'], p['rsi_trend'], p['target'], p['stop'], trades=trades)
+        ref.update((sym, side, t) for side, t, _ in trades)
+    return ref
+
+
+def _match_shifted(engine, ref, buckets, tolerance):
+    """Pairs leftover decisions with the same symbol/side at most `tolerance` 2H bars apart, in time order."""
+    pairs, ref_left = [], sorted(ref, key=lambda x: x[2])
+    for sym, side, t in sorted(engine, key=lambda x: x[2]):
+        pos = buckets[sym].get_loc(t)
+        for r in ref_left:
+            if r[0] == sym and r[1] == side and abs(buckets[sym].get_loc(r[2]) - pos) <= tolerance:
+                pairs.append(((sym, side, t), r))
+                ref_left.remove(r)
+                break
+    return pairs
+
+
+def compare_decisions(decisions, bars, params, start, end, tolerance=MATCH_TOLERANCE_BARS,
+                      min_agreement=MIN_AGREEMENT):
+    """Matches engine fills against the backtest by (symbol, side, 2H bar), allowing `tolerance` bars of shift.
+
+    `passed` is False when agreement falls below `min_agreement`.
+    """
+    buckets = {s: resample_2h(df).index for s, df in bars.items()}
+    engine = {(d['symbol'], d['side'], _bucket(d['time'], buckets[d['symbol']])) for d in decisions}
+    ref = reference_decisions(bars, params, start, end)
+    both = engine & ref
+    shifted = _match_shifted(engine - both, ref - both, buckets, tolerance)
+    engine_only = engine - both - {e for e, _ in shifted}
+    backtest_only = ref - both - {r for _, r in shifted}
+    matched = len(both) + len(shifted)
+    agreement = matched / max(matched + len(engine_only) + len(backtest_only), 1)
+    return {
+        "engine": len(engine), "backtest": len(ref), "exact": len(both), "shifted": len(shifted),
+        "matched": matched, "agreement": agreement, "min_agreement": min_agreement,
+        "passed": agreement >= min_agreement,
+        "engine_only": sorted(engine_only, key=lambda x: x[2]),
+        "backtest_only": sorted(backtest_only, key=lambda x: x[2]),
+    }
+
+
+# --- HARNESS ---
+def run_replay(bars, params=None, warmup_days=LOOKBACK_DAYS, step_minutes=60, cash=100000.0, check=True,
+               min_agreement=MIN_AGREEMENT):
+    """Runs `main.heart_beat` over `bars` on a simulated clock and returns a report dict.
+
+    The first `warmup_days` of data only feed indicators. Heartbeats fire every
+    `step_minutes` of simulated market time; closed-market stretches are skipped.
+    With 1H bars the engine sees nothing new inside a bar, so the default of one
+    heartbeat per bar gives the same decisions as the live 1-minute cadence
+    (`step_minutes=1`) at a fraction of the cost.
+    Uses a throwaway DB so the real `data/trading.db` is never touched.
+    """
+    from src.main import heart_beat
+
+    params = params or {s: dict(DEFAULT_PARAMS) for s in bars}
+    first = min(df.index[0] for df in bars.values())
+    start = first.normalize() + pd.Timedelta(days=warmup_days)
+    end = max(df.index[-1] for df in bars.values()) + pd.Timedelta(hours=1)
+
+    original_db = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "replay.db")
+        database.init_db()
+        for sym, p in params.items():
+            database.save_strategy(sym, p, False)
+
+        clock = SimClock(start)
+        market = SimMarket(bars, clock)
+        client = SimTradingClient(market, cash=cash)
+        broker = SimBroker(client)
+
+        heartbeats = 0
+        t0 = time.perf_counter()
+        try:
+            while clock.now() < end:
+                if not market.is_open():
+                    nxt = market.next_open()
+                    if nxt is None: break
+                    client.settle(clock.now(), nxt)
+                    clock.jump_to(nxt)
+                    continue
+                heart_beat(broker=broker, fetch_bars=market.visible_bars)
+                heartbeats += 1
+                prev = clock.now()
+                clock.advance(step_minutes)
+                client.settle(prev, clock.now())
+        finally:
+            database.DB_PATH = original_db
+        wall = time.perf_counter() - t0
+
+    sim_minutes = (clock.now() - start).total_seconds() / 60
+    report = {
+        "start": start, "end": clock.now(), "heartbeats": heartbeats, "wall_s": wall,
+        "sim_minutes": sim_minutes, "sim_minutes_per_s": sim_minutes / max(wall, 1e-9),
+        "decisions": client.decisions, "final_equity": client.get_account().portfolio_value,
+    }
+    if check:
+        report["check"] = compare_decisions(client.decisions, bars, params, start, clock.now(),
+                                            min_agreement=min_agreement)
+    return report
+
+
+def print_report(report):
+    print(f"⏪ Replay {report['start']} -> {report['end']}")
+    print(f"   heartbeats: {report['heartbeats']}  wall: {report['wall_s']:.1f}s  "
+          f"throughput: {report['sim_minutes_per_s']:,.0f} sim-min/s")
+    print(f"   fills: {len(report['decisions'])}  final equity: ${report['final_equity']:,.2f}")
+    chk = report.get("check")
+    if chk:
+        print(f"   vs backtest: {chk['exact']} exact + {chk['shifted']} one bar apart, "
+              f"{len(chk['engine_only'])} engine-only, {len(chk['backtest_only'])} backtest-only "
+              f"({chk['agreement']:.0%} agreement)")
+        if not chk['passed']:
+            print(f"   ❌ FAIL: agreement below {chk['min_agreement']:.0%}, engine and backtest have diverged")
+        for sym, side, t in chk['engine_only'][:10]: print(f"     engine only:   {t} {sym} {side}")
+        for sym, side, t in chk['backtest_only'][:10]: print(f"     backtest only: {t} {sym} {side}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay market data through heart_beat on a simulated clock")
+    parser.add_argument("--symbols", default="HOOD,AMD,AI,CVNA,PLTR")
+    parser.add_argument("--data", help="Directory of <SYMBOL>.csv bars (default: synthetic)")
+    parser.add_argument("--record", action="store_true", help="Download bars into --data and exit")
+    parser.add_argument("--days", type=int, default=120,
+                        help=f"Synthetic days to generate (the first {LOOKBACK_DAYS} calendar days are warm-up)")
+    parser.add_argument("--step", type=int, default=60, help="Simulated minutes between heartbeats")
+    parser.add_argument("--no-check", action="store_true", help="Skip the backtest comparison")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="Exit non-zero when engine/backtest agreement is below this")
+    args = parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.record:
+        record_bars(symbols, args.data or "data/replay")
+        sys.exit(0)
+    if args.data:
+        bars = {s: load_bars(os.path.join(args.data, f"{s}.csv")) for s in symbols}
+    else:
+        bars = {s: synthetic_bars(s, days=args.days, seed=i) for i, s in enumerate(symbols)}
+    report = run_replay(bars, step_minutes=args.step, check=not args.no_check, min_agreement=args.min_agreement)
+    print_report(report)
+    if not report.get("check", {"passed": True})["passed"]: sys.exit(1)
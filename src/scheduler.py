@@ -0,0 +1,159 @@
+import time
+import json
+import threading
+
+LIVENESS_FILE = "/tmp/heartbeat"
+
+
+def mark_alive(path=LIVENESS_FILE):
+    """Liveness signal for the container healthcheck; only call after a cycle completed."""
+    with open(path, "w") as f: f.write(str(time.time()))
+
+
+def liveness_path(name):
+    """Per-worker liveness file, e.g. /tmp/heartbeat_paper."""
+    return f"{LIVENESS_FILE}_{name.lower()}"
+
+
+def stale_liveness(paths, max_age_s, now=None):
+    """Names of the liveness files that are missing, unreadable or older than `max_age_s`."""
+    now = time.time() if now is None else now
+    stale = []
+    for path in paths:
+        try:
+            with open(path) as f: last = float(f.read().strip())
+        except (OSError, ValueError): last = None
+        if last is None or now - last > max_age_s: stale.append(path)
+    return stale
+
+
+class Task:
+    """A periodic job pinned to wall-clock phases (every `interval_s`, offset by `phase_s`)."""
+
+    def __init__(self, name, fn, interval_s, phase_s=0.0, timeout_s=None, liveness=False):
+        self.name = name
+        self.fn = fn
+        self.interval_s = float(interval_s)
+        self.phase_s = float(phase_s) % self.interval_s
+        self.timeout_s = timeout_s
+        self.liveness = liveness
+
+        self.next_due = None
+        self._thread = None
+        self._started = 0.0
+        self._timed_out = False
+
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.last_duration_ms = 0.0
+        self.last_completed = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def align(self, mono_now, wall_now):
+        """First due time: the next wall-clock slot (k * interval + phase), on the monotonic clock."""
+        k = (wall_now - self.phase_s) // self.interval_s + 1
+        self.next_due = mono_now + (k * self.interval_s + self.phase_s - wall_now)
+
+    def stats(self):
+        return {"runs": self.runs, "errors": self.errors, "overruns": self.overruns, "skipped": self.skipped,
+                "timeouts": self.timeouts, "last_ms": round(self.last_duration_ms, 1),
+                "last_completed": self.last_completed}
+
+
+class EngineScheduler:
+    """Drift-free scheduler for the engine loop, driven by `time.monotonic`.
+
+    Each task runs on its own thread at fixed phases. Due times advance in whole
+    intervals from the first aligned slot, so a slow run never shifts later ticks.
+    A tick that comes due while the previous run is still going is skipped and
+    counted as an overrun; ticks missed while the loop was stalled are coalesced
+    into one run and counted as skipped. A run over `timeout_s` is flagged; Python
+    threads cannot be killed, so the task keeps its slot until it returns.
+    Liveness is written only when a `liveness` task finishes cleanly.
+    """
+
+    def __init__(self, on_stats=None, clock=time.monotonic, wall=time.time, liveness=mark_alive):
+        self.tasks = []
+        self.on_stats = on_stats
+        self._clock = clock
+        self._wall = wall
+        self._liveness = liveness
+        self._lock = threading.Lock()
+
+    def add(self, name, fn, interval_s, phase_s=0.0, timeout_s=None, liveness=False):
+        task = Task(name, fn, interval_s, phase_s, timeout_s, liveness)
+        task.align(self._clock(), self._wall())
+        self.tasks.append(task)
+        return task
+
+    def _execute(self, task):
+        ok = True
+        try: task.fn()
+        except Exception as e:
+            ok = False
+            print(f"❌ Task {task.name} failed: {e}")
+        duration = self._clock() - task._started
+        with self._lock:
+            task.runs += 1
+            task.last_duration_ms = duration * 1000
+            if ok: task.last_completed = self._wall()
+            else: task.errors += 1
+            timed_out = task._timed_out
+        if ok and task.liveness and not timed_out:
+            try: self._liveness()
+            except Exception as e: print(f"Liveness Error: {e}")
+        self._report()
+
+    def _report(self):
+        if self.on_stats is None: return
+        try: self.on_stats(self.stats())
+        except Exception as e: print(f"Scheduler Stats Error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {t.name: t.stats() for t in self.tasks}
+
+    def run_pending(self):
+        """Starts every task that is due. Returns seconds until the next due time."""
+        now = self._clock()
+        for task in self.tasks:
+            if task.running and task.timeout_s and not task._timed_out and now - task._started > task.timeout_s:
+                with self._lock:
+                    task._timed_out = True
+                    task.timeouts += 1
+                print(f"⏱️ Task {task.name} exceeded {task.timeout_s}s timeout")
+                self._report()
+
+            if now < task.next_due: continue
+            missed = int((now - task.next_due) // task.interval_s)
+            task.next_due += (missed + 1) * task.interval_s
+            with self._lock:
+                task.skipped += missed
+                if task.running:
+                    task.overruns += 1
+                    print(f"⚠️ Task {task.name} still running, skipping tick")
+                    continue
+                task._started = now
+                task._timed_out = False
+            task._thread = threading.Thread(target=self._execute, args=(task,), name=f"task-{task.name}",
+                                            daemon=True)
+            task._thread.start()
+        return max(0.0, min(t.next_due for t in self.tasks) - self._clock()) if self.tasks else 1.0
+
+    def run_forever(self, on_tick=None, max_sleep=1.0):
+        """Main loop. `on_tick` runs every iteration (e.g. `schedule.run_pending` for weekly jobs)."""
+        while True:
+            wait = self.run_pending()
+            if on_tick is not None: on_tick()
+            time.sleep(min(max(wait, 0.01), max_sleep))
+
+
+def status_reporter(update_status, key="scheduler"):
+    """`on_stats` callback that stores scheduler stats as JSON in system_status."""
+    return lambda stats: update_status(key, json.dumps(stats))
@@ -0,0 +1,244 @@
+import time
+import random
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from src.broker import Broker
+from src.indicators import LOOKBACK_DAYS
+
+
+class FakeTradingClient:
+    """Local stand-in for alpaca's TradingClient that injects request latency.
+
+    Every call sleeps for `latency_ms` (plus up to `jitter_ms`) so dispatch and timing
+    code can be exercised without touching the network.
+    """
+
+    def __init__(self, latency_ms=100.0, jitter_ms=0.0, seed=42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.orders = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep((self.latency_ms + jitter) / 1000)
+
+    def get_clock(self):
+        self._delay()
+        return SimpleNamespace(is_open=True)
+
+    def get_account(self):
+        self._delay()
+        return SimpleNamespace(id="fake-account", portfolio_value=100000.0, buying_power=100000.0, cash=100000.0)
+
+    def submit_order(self, req):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self._delay()
+            order = SimpleNamespace(id=str(uuid.uuid4()), symbol=req.symbol, qty=req.qty, side=req.side,
+                                    status='accepted', request=req, submitted_at=time.time())
+            with self._lock:
+                self.orders[order.id] = order
+            return order
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class FakeBroker(Broker):
+    """`Broker` wired to a FakeTradingClient instead of Alpaca."""
+
+    def __init__(self, client=None, mode="PAPER"):
+        self.mode = mode
+        self.client = client or FakeTradingClient()
+
+
+# --- REPLAY SIMULATION ---
+class SimClock:
+    """Simulated wall clock; the replay harness advances it instead of waiting."""
+
+    def __init__(self, start):
+        self._now = pd.Timestamp(start)
+
+    def now(self):
+        return self._now
+
+    def advance(self, minutes=1):
+        self._now += pd.Timedelta(minutes=minutes)
+
+    def jump_to(self, ts):
+        self._now = pd.Timestamp(ts)
+
+
+class SimMarket:
+    """Recorded or synthetic 1H bars seen through a SimClock.
+
+    Only bars that have started by `clock.now()` are visible. The bar in progress is
+    exposed open-only (O=H=L=C=open, no volume), so nothing from the future leaks into
+    the engine.
+    """
+
+    BAR_NS = pd.Timedelta(hours=1).value
+
+    def __init__(self, bars, clock, lookback_days=LOOKBACK_DAYS):
+        self.clock = clock
+        self.bars = {}
+        self._starts = {}
+        for sym, df in bars.items():
+            df = df.sort_index()
+            self.bars[sym] = df
+            self._starts[sym] = df.index.as_unit('ns').asi8
+        self.lookback_ns = pd.Timedelta(days=lookback_days).value
+        self.session_starts = np.unique(np.concatenate(list(self._starts.values())))
+
+    def _pos(self, sym):
+        """Index of the last bar that has started, and whether it is still in progress."""
+        now = self.clock.now().value
+        i = int(np.searchsorted(self._starts[sym], now, side='right')) - 1
+        return i, i >= 0 and now < self._starts[sym][i] + self.BAR_NS
+
+    def visible_bars(self, sym):
+        """Drop-in for `main.get_recent_bars` during replay."""
+        df = self.bars.get(sym)
+        if df is None: return pd.DataFrame()
+        i, in_progress = self._pos(sym)
+        if i < 0: return df.iloc[:0]
+        lo = int(np.searchsorted(self._starts[sym], self.clock.now().value - self.lookback_ns, side='left'))
+        view = df.iloc[lo:i + 1].copy()
+        if in_progress:
+            o = view['Open'].iloc[-1]
+            view.iloc[-1, view.columns.get_indexer(['High', 'Low', 'Close'])] = o
+            view.iloc[-1, view.columns.get_loc('Volume')] = 0
+        return view
+
+    def last_price(self, sym):
+        if sym not in self.bars: return 0.0
+        i, in_progress = self._pos(sym)
+        if i < 0: return 0.0
+        row = self.bars[sym].iloc[i]
+        return float(row['Open'] if in_progress else row['Close'])
+
+    def is_open(self):
+        now = self.clock.now().value
+        i = int(np.searchsorted(self.session_starts, now, side='right')) - 1
+        return i >= 0 and now < self.session_starts[i] + self.BAR_NS
+
+    def next_open(self):
+        """Start of the next bar after now, or None when the data runs out."""
+        i = int(np.searchsorted(self.session_starts, self.clock.now().value, side='right'))
+        if i >= len(self.session_starts): return None
+        return pd.Timestamp(self.session_starts[i], tz='UTC').tz_convert(self.clock.now().tz)
+
+    def bars_closed_between(self, sym, t0, t1):
+        """Bars whose end falls in (t0, t1]."""
+        starts = self._starts[sym]
+        lo = int(np.searchsorted(starts, t0.value - self.BAR_NS, side='right'))
+        hi = int(np.searchsorted(starts, t1.value - self.BAR_NS, side='right'))
+        return self.bars[sym].iloc[lo:hi]
+
+
+class SimTradingClient(FakeTradingClient):
+    """Fills orders against a SimMarket and tracks cash, positions and bracket legs.
+
+    Market orders fill immediately at the current price. Bracket take-profit/stop-loss
+    legs are checked on every bar that closes (stop first, gap-through fills at the
+    bar open), mirroring `tuner.backtest`.
+    """
+
+    def __init__(self, market, cash=100000.0):
+        super().__init__(latency_ms=0.0)
+        self.market = market
+        self.cash = float(cash)
+        self.positions = {}
+        self.decisions = []
+
+    def _delay(self):
+        pass
+
+    def _fill(self, sym, side, qty, px, reason, at=None):
+        now = self.market.clock.now() if at is None else at
+        if side == 'buy': self.cash -= qty * px
+        else: self.cash += qty * px
+        self.decisions.append({"symbol": sym, "side": side, "qty": qty, "price": px, "time": now, "reason": reason})
+        order = SimpleNamespace(id=str(uuid.uuid4()), symbol=sym, qty=qty, side=side, status='filled',
+                                filled_avg_price=px, filled_at=datetime.now(timezone.utc).isoformat())
+        self.orders[order.id] = order
+        return order
+
+    def get_clock(self):
+        return SimpleNamespace(is_open=self.market.is_open())
+
+    def get_account(self):
+        equity = self.cash + sum(p['qty'] * self.market.last_price(s) for s, p in self.positions.items())
+        return SimpleNamespace(id="sim-account", portfolio_value=equity, buying_power=self.cash, cash=self.cash)
+
+    def submit_order(self, req):
+        sym, qty = req.symbol, float(req.qty)
+        px = self.market.last_price(sym)
+        if px <= 0: raise ValueError(f"No price for {sym}")
+        side = 'buy' if str(req.side).lower().endswith('buy') else 'sell'
+        if side == 'sell':
+            return self.close_position(sym)
+        tp = getattr(req, 'take_profit', None)
+        sl = getattr(req, 'stop_loss', None)
+        self.positions[sym] = {"qty": qty, "entry": px,
+                               "tp": float(tp.limit_price) if tp else None,
+                               "sl": float(sl.stop_price) if sl else None}
+        return self._fill(sym, 'buy', qty, px, 'signal')
+
+    def get_order_by_id(self, oid):
+        return self.orders[oid]
+
+    def get_open_position(self, sym):
+        p = self.positions.get(sym)
+        if not p: raise KeyError(f"position does not exist: {sym}")
+        px = self.market.last_price(sym)
+        return SimpleNamespace(symbol=sym, qty=p['qty'], avg_entry_price=p['entry'], current_price=px,
+                               market_value=p['qty'] * px)
+
+    def get_all_positions(self):
+        return [self.get_open_position(s) for s in self.positions]
+
+    def close_position(self, sym):
+        p = self.positions.pop(sym, None)
+        if not p: raise KeyError(f"position does not exist: {sym}")
+        return self._fill(sym, 'sell', p['qty'], self.market.last_price(sym), 'close')
+
+    def settle(self, t0, t1):
+        """Triggers bracket legs on every bar that closed between t0 and t1."""
+        for sym in list(self.positions):
+            p = self.positions[sym]
+            for bar_start, bar in self.market.bars_closed_between(sym, t0, t1).iterrows():
+                if p['sl'] is not None and bar['Low'] <= p['sl']:
+                    px, reason = min(bar['Open'], p['sl']), 'stop_loss'
+                elif p['tp'] is not None and bar['High'] >= p['tp']:
+                    px, reason = max(bar['Open'], p['tp']), 'take_profit'
+                else: continue
+                del self.positions[sym]
+                # Stamped with the bar it triggered in, not the heartbeat that noticed it
+                self._fill(sym, 'sell', p['qty'], float(px), reason, at=bar_start)
+                break
+
+
+class SimBroker(Broker):
+    """`Broker` backed by a SimTradingClient; prices and market hours come from the replay."""
+
+    def __init__(self, client, mode="PAPER"):
+        self.mode = mode
+        self.client = client
+
+    def get_latest_price(self, symbol):
+        return self.client.market.last_price(symbol)
+
+    def get_market_clock(self):
+        return "🟢 Market Open (Simulated)" if self.client.market.is_open() else "🔴 Market Closed (Simulated)"
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from src import database
+
+QUANTILES = (0.5, 0.95, 0.99)
+_COLUMNS = ("rowid, order_id, symbol, side, qty, order_type, snapshot_price, fill_price, "
+            "submitted_at, filled_at, api_latency_ms, queue_wait_ms, status")
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+def _to_epoch(col):
+    """ISO strings (naive = UTC, 'Z' or offsets) -> float epoch seconds, NaN when unparseable."""
+    ts = pd.to_datetime(col.str.replace("Z", "+00:00", regex=False), utc=True, errors="coerce", format="ISO8601")
+    return (ts - _EPOCH) / pd.Timedelta(seconds=1)
+
+
+def _prepare(df):
+    """Adds the numeric per-order columns every aggregate is built from, in one pass."""
+    df = df.copy()
+    for c in ("qty", "snapshot_price", "fill_price", "api_latency_ms", "queue_wait_ms"):
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df["submitted_ts"] = _to_epoch(df["submitted_at"].astype("string"))
+    df["filled_ts"] = _to_epoch(df["filled_at"].astype("string"))
+
+    sign = np.where(df["side"].str.lower().str.contains("sell", na=False), -1.0, 1.0)
+    filled = (df["status"] == "FILLED").to_numpy()
+    priced = filled & (df["snapshot_price"] > 0).to_numpy() & (df["fill_price"] > 0).to_numpy()
+    snap, fill, qty = df["snapshot_price"].to_numpy(), df["fill_price"].to_numpy(), df["qty"].to_numpy()
+
+    df["filled"] = filled.astype(float)
+    df["slippage_pct"] = np.where(priced, sign * (fill - snap) / np.where(priced, snap, 1.0) * 100, np.nan)
+    df["fill_latency_ms"] = np.where(filled, (df["filled_ts"] - df["submitted_ts"]).to_numpy() * 1000, np.nan)
+    # Implementation shortfall vs. the decision (snapshot) price; positive = cost
+    df["shortfall_usd"] = np.where(priced, sign * (fill - snap) * qty, 0.0)
+    df["notional_usd"] = np.where(priced, snap * qty, 0.0)
+    df["hour_utc"] = (df["submitted_ts"] // 3600 % 24).astype("Int64")
+    return df
+
+
+def load_executions(conn, min_rowid=None, rowids=None, exclude_status=None):
+    """Reads trade_execution in columnar form with numeric epoch timestamps."""
+    sql, args = f"SELECT {_COLUMNS} FROM trade_execution WHERE 1=1", []
+    if min_rowid is not None: sql, args = sql + " AND rowid >= ?", args + [int(min_rowid)]
+    if rowids is not None:
+        sql, args = sql + " AND rowid IN (SELECT value FROM json_each(?))", args + [json.dumps([int(r) for r in rowids])]
+    if exclude_status: sql, args = sql + " AND status != ?", args + [exclude_status]
+    return _prepare(pd.read_sql(sql, conn, params=args))
+
+
+def _summarize(df, key):
+    g = df.groupby(key, dropna=True)
+    out = pd.DataFrame({
+        "orders": g.size(),
+        "fill_rate": g["filled"].mean(),
+        "shortfall_usd": g["shortfall_usd"].sum(),
+    })
+    notional = g["notional_usd"].sum()
+    out["shortfall_bps"] = (out["shortfall_usd"] / notional.where(notional > 0)) * 1e4
+    for col, name in (("slippage_pct", "slip_pct"), ("api_latency_ms", "api_ms"),
+                      ("fill_latency_ms", "fill_ms"), ("queue_wait_ms", "queue_ms")):
+        q = g[col].quantile(list(QUANTILES)).unstack()
+        q.columns = [f"{name}_p{int(p * 100)}" for p in q.columns]
+        out = out.join(q)
+    return out
+
+
+def compute_tca(df):
+    """Per-symbol, per-hour (UTC) and overall slippage/latency percentiles, fill rate and shortfall."""
+    if df.empty:
+        return {"by_symbol": pd.DataFrame(), "by_hour": pd.DataFrame(), "overall": pd.DataFrame()}
+    return {
+        "by_symbol": _summarize(df, "symbol"),
+        "by_hour": _summarize(df, "hour_utc"),
+        "overall": _summarize(df.assign(_all="ALL"), "_all"),
+    }
+
+
+class TCACache:
+    """Materialized TCA results over trade_execution, refreshed incrementally.
+
+    Only rows added since the last refresh are read, plus rows that were still NEW and
+    have since been filled or cancelled. Timestamp parsing happens once per row and
+    the aggregates are recomputed only when something changed. A row re-inserted
+    under a new rowid (INSERT OR REPLACE) supersedes its old copy by order_id; if the
+    cached row count then disagrees with the table (rows deleted), it reloads in full.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._frame = None
+        self._max_rowid = 0
+        self._lock = threading.Lock()
+        self.results = compute_tca(pd.DataFrame())
+
+    def _merge(self, new, changed):
+        if self._frame is None: return new
+        if new.empty and (changed is None or changed.empty): return self._frame
+        parts = [self._frame]
+        if changed is not None and not changed.empty:
+            parts = [self._frame[~self._frame["rowid"].isin(changed["rowid"])], changed]
+        frame = pd.concat(parts + [new], ignore_index=True)
+        return frame.drop_duplicates("order_id", keep="last").reset_index(drop=True)
+
+    def refresh(self):
+        """Pulls changes from the DB. Returns True if the results were recomputed."""
+        with self._lock:
+            with sqlite3.connect(self.db_path or database.DB_PATH) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM trade_execution").fetchone()[0]
+                new = load_executions(conn, min_rowid=self._max_rowid + 1)
+                changed = None
+                if self._frame is not None:
+                    open_rows = self._frame.loc[self._frame["status"] == "NEW", "rowid"]
+                    if not open_rows.empty:
+                        changed = load_executions(conn, rowids=open_rows, exclude_status="NEW")
+                frame = self._merge(new, changed)
+                if len(frame) != count:
+                    frame = load_executions(conn)
+
+            if frame is self._frame:
+                return False
+            self._frame = frame
+            self._max_rowid = int(frame["rowid"].max()) if not frame.empty else 0
+            self.results = compute_tca(frame)
+            return True
+
+    def get(self):
+        self.refresh()
+        return self.results
+
+
+_caches = {}
+
+
+def get_tca(db_path=None):
+    """Process-wide TCA results for `db_path` (defaults to the active DB)."""
+    path = db_path or database.DB_PATH
+    if path not in _caches: _caches[path] = TCACache(path)
+    return _caches[path].get()
@@ -1,13 +1,15 @@
 import yfinance as yf
-import pandas_ta_classic as ta
 import optuna
 import urllib3
 import pandas as pd
 import numpy as np
 import gc
 from functools import partial
-from src.database import save_strategy, init_db
+from src.database import save_strategy, init_db, init_account_dbs
 from src.broker import Broker
+from src.config import Config
+from src.profiling import profiled
+from src.indicators import RSI_EXIT, resample_2h, add_indicators
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 TICKERS = ['HOOD', 'AMD', 'AI', 'CVNA', 'PLTR']
@@ -36,32 +38,13 @@ def get_stock_data(symbol):
         return None
 
 
+@profiled
 def precompute_indicators(df):
-    df = df.copy()
     try:
-        # --- CRITICAL: Resample to 2H to match Backtest Logic ---
-        # Origin='start_day' ensures 9:30 candles align correctly (9:30-11:30)
-        # We assume 9:30 market open.
-        logic = {
-            'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
-        }
-        # offset='30min' helps align with NYSE 9:30 open if the index is clean, 
-        # but origin='start_day' is usually safer for intraday chunks
-        df_2h = df.resample('2h', origin='start_day').apply(logic).dropna()
-
+        # Same 2H bars and indicator code as main.compute_signals, so tuned params fit what the engine sees
+        df_2h = resample_2h(df.copy())
         if df_2h.empty: return None
-
-        # --- Calculate Indicators on the 2H Data ---
-        adx_df = ta.adx(df_2h['High'], df_2h['Low'], df_2h['Close'], length=14)
-        if adx_df is None or adx_df.empty:
-            return None
-
-        adx_col = next((c for c in adx_df.columns if c.startswith("ADX")), None)
-        if not adx_col:
-            return None
-
-        df_2h['ADX'] = adx_df[adx_col]
-        df_2h['RSI'] = ta.rsi(df_2h['Close'], length=14)
+        df_2h = add_indicators(df_2h)
 
         # Shift for anti-lookahead (Decision based on PREVIOUS closed candle)
         df_2h['ADX_Prev'] = df_2h['ADX'].shift(1)
@@ -74,13 +57,11 @@ def precompute_indicators(df):
         return None
 
 
-def objective(trial, df):
-    # Parameter Search Space
-    adx_thresh = trial.suggest_int("adx_trend", 20, 35)
-    rsi_thresh = trial.suggest_int("rsi_trend", 40, 65)
-    tp = trial.suggest_float("target", 0.05, 0.25)
-    sl = trial.suggest_float("stop", 0.03, 0.12)
+def backtest(df, adx_thresh, rsi_thresh, tp, sl, trades=None):
+    """Runs the 2H strategy over precomputed indicators and returns the fractional return.
 
+    If `trades` is a list, every decision is appended to it as (side, bar_time, price).
+    """
     opens = df['Open'].values
     highs = df['High'].values
     lows = df['Low'].values
@@ -101,58 +82,107 @@ def objective(trial, df):
             if lows[i] <= stop_px:
                 balance = pos * min(opens[i], stop_px)
                 pos = 0
+                if trades is not None: trades.append(("sell", df.index[i], min(opens[i], stop_px)))
                 continue
             if highs[i] >= take_px:
                 balance = pos * max(opens[i], take_px)
                 pos = 0
+                if trades is not None: trades.append(("sell", df.index[i], max(opens[i], take_px)))
                 continue
             
-            # RSI Panic Exit (on 2H bar close)
-            if rsi_p[i] < 35: 
+            # RSI Panic Exit (on 2H bar close), same threshold as the live engine
+            if rsi_p[i] < RSI_EXIT:
                 balance = pos * opens[i]
                 pos = 0
+                if trades is not None: trades.append(("sell", df.index[i], opens[i]))
                 continue
         else:
             # Entry Logic
             if adx_p[i] > adx_thresh and rsi_p[i] > rsi_thresh:
                 entry = opens[i]
                 pos = balance / entry
+                if trades is not None: trades.append(("buy", df.index[i], entry))
 
     final = balance if pos == 0 else pos * closes[-1]
     return (final - 1000.0) / 1000.0
 
 
-def optimize_stock(symbol, broker):
-    print(f"🕵️ Tuning {symbol} (2H timeframe)...")
+@profiled
+def objective(trial, df):
+    # Parameter Search Space
+    adx_thresh = trial.suggest_int("adx_trend", 20, 35)
+    rsi_thresh = trial.suggest_int("rsi_trend", 40, 65)
+    tp = trial.suggest_float("target", 0.05, 0.25)
+    sl = trial.suggest_float("stop", 0.03, 0.12)
+    return backtest(df, adx_thresh, rsi_thresh, tp, sl)
+
+
+def tune_symbol(symbol):
+    """Downloads data and runs the Optuna search. Returns (best_params, best_value) or None."""
     raw = get_stock_data(symbol)
     if raw is None or len(raw) < 100:
-        return
+        return None
     
     # Precompute converts 1H raw -> 2H signals
     df = precompute_indicators(raw)
     if df is None:
-        return
+        return None
 
     try:
         sampler = optuna.samplers.TPESampler(seed=42)
         study = optuna.create_study(direction="maximize", sampler=sampler)
         study.optimize(partial(objective, df=df), n_trials=50) # 50 trials for speed
+        result = (study.best_params, study.best_value)
 
-        is_holding = broker.is_holding(symbol)
-        save_strategy(symbol, study.best_params, is_holding is not None)
-        print(f"✅ Tuned {symbol}: {study.best_value:.2%} (Params: {study.best_params})")
-        
         del df
         del raw
         del study
         gc.collect()
+        return result
+    except Exception as e:
+        print(f"⚠️ Error {symbol}: {e}")
+        return None
+
+
+@profiled
+def optimize_stock(symbol, broker, accounts=None):
+    """Tunes `symbol` once and saves the result.
+
+    `accounts` maps DB path -> Broker for supervisor mode, where every account gets
+    the same params but its own holding flag. Defaults to `broker` on the active DB.
+    """
+    print(f"🕵️ Tuning {symbol} (2H timeframe)...")
+    result = tune_symbol(symbol)
+    if result is None:
+        return
+    best_params, best_value = result
+
+    try:
+        for db_path, acct_broker in (accounts or {None: broker}).items():
+            is_holding = acct_broker.is_holding(symbol)
+            save_strategy(symbol, best_params, is_holding is not None, db_path=db_path)
+        print(f"✅ Tuned {symbol}: {best_value:.2%} (Params: {best_params})")
     except Exception as e:
         print(f"⚠️ Error {symbol}: {e}")
 
 
 if __name__ == "__main__":
-    init_db()
+    import argparse
+    from src import profiling
+    parser = argparse.ArgumentParser(description="Tune strategy params for TICKERS")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="Write per-run profiles under data/profiles (same as PROFILE=...)")
+    parser.add_argument("--accounts", default=",".join(Config.engine_accounts()),
+                        help="Comma-separated accounts whose DBs to write (default: the supervisor's; "
+                             "empty = the default DB)")
+    args = parser.parse_args()
+    if args.profile: profiling.enable(args.profile)
+
+    accounts = [a.strip().upper() for a in args.accounts.split(",") if a.strip()]
+    # Same targets as the supervisor's weekly job: one tuning pass, saved to every account's DB
+    targets = dict(zip(init_account_dbs(accounts), map(Broker, accounts))) if accounts else None
+    if targets is None: init_db()
     broker = Broker()
-    print("🚀 Starting AI Parameter Tuning (2H Candles)...")
+    print(f"🚀 Starting AI Parameter Tuning (2H Candles) for {', '.join(accounts) or 'default DB'}...")
     for t in TICKERS:
-        optimize_stock(t, broker)
\ No newline at end of file
+        optimize_stock(t, broker, accounts=targets)
\ No newline at end of file